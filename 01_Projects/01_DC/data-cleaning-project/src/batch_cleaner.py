@@ -0,0 +1,122 @@
+"""
+Batch mode: clean every file matching a glob pattern in a process pool
+python batch_cleaner.py "../data/daily/*.csv" --output-dir ../data/cleaned --workers 4
+"""
+import argparse
+import glob
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from data_cleaner import DataCleaner, BASE_DIR, logger
+
+
+def output_names(input_paths:list, pattern:str) -> dict:
+    """
+    Unique name per input file for output file, log context and report
+    The name is the path relative to the directory before the first glob character, e.g. for the pattern
+    "drops/*/export.csv" the file drops/a/export.csv is named "a_export".
+    Raise ValueError if two input files would still get the same name (e.g. a.csv and a.parquet)
+    :return: dict input path -> name
+    """
+    root_parts = []
+    for part in Path(pattern).parts[:-1]:
+        if any(char in part for char in "*?["):
+            break
+        root_parts.append(part)
+    root = Path(*root_parts) if root_parts else Path(".")
+
+    names = {}
+    for input_path in input_paths:
+        relative = Path(input_path).relative_to(root)
+        names[input_path] = "_".join(relative.with_suffix("").parts)
+    duplicates = sorted(name for name in set(names.values()) if list(names.values()).count(name) > 1)
+    if duplicates:
+        raise ValueError(f"Input files with the same output name {duplicates}, "
+                         f"outputs and reports would overwrite each other")
+    return names
+
+
+def clean_file(input_path:str, output_path:str, chunk_size:int=None, name:str=None):
+    """
+    Clean a single file (runs in a worker process), return manifest entry
+    :param name: Log context and report name (default: file name without extension)
+    """
+    name = name or Path(input_path).stem
+    start = time.perf_counter()
+    result = {"input": str(input_path), "output": str(output_path)}
+    try:
+        cleaner = DataCleaner(input_path, output_path, chunk_size=chunk_size, log_context=name, report_name=name)
+        cleaner.process_cleaning()
+        # Reports rendered in the background would be lost when the worker process exits
+        cleaner.wait_for_profiles()
+    except Exception as e:
+        logger.getChild(name).error(f"Cleaning of {input_path} failed: {e}")
+        result.update({"rows_in": None, "rows_out": None, "error": str(e)})
+    else:
+        result.update({"rows_in": cleaner.rows_in, "rows_out": cleaner.rows_out, "error": None})
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def clean_directory(pattern:str, output_dir:str, workers:int=None, output_format:str="csv",
+                    chunk_size:int=None, manifest_path:str=None):
+    """
+    Clean all files matching pattern in parallel, each file gets its own output file and log context
+    Files are named by their path below the glob root (see output_names), so equal file names don't collide
+    Note: a persisted dedup index (dedup_index_path) is not shared between the worker processes
+    :param workers: Number of worker processes (default: number of CPUs)
+    :param output_format: Extension of the output files (csv, parquet, feather)
+    :param manifest_path: Summary json with rows in/out and seconds per file (default: <output_dir>/manifest.json)
+    :return: list of manifest entries
+    """
+    input_paths = sorted(glob.glob(pattern))
+    names = output_names(input_paths, pattern)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Batch cleaning of {len(input_paths)} files matching {pattern} with {workers or 'all'} workers")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(clean_file, input_path,
+                                   output_dir / f"{names[input_path]}_cleaned.{output_format}", chunk_size,
+                                   names[input_path])
+                   for input_path in input_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            logger.info(f"Finished {result['input']}: {result['rows_in']} -> {result['rows_out']} rows "
+                        f"in {result['seconds']} s")
+            results.append(result)
+    results.sort(key=lambda result: result["input"])
+
+    manifest = {
+        "pattern": pattern,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - start, 3),
+        "files": results
+    }
+    manifest_path = Path(manifest_path) if manifest_path else output_dir / "manifest.json"
+    with open(manifest_path, mode="w") as file:
+        json.dump(manifest, file, indent=2)
+    logger.info(f"Manifest saved in {manifest_path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean all files matching a glob pattern")
+    parser.add_argument("pattern", help="Glob pattern of input files, e.g. '../data/daily/*.csv'")
+    parser.add_argument("--output-dir", default=str(BASE_DIR / "../data/cleaned"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", dest="output_format", default="csv", choices=["csv", "parquet", "feather"])
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--manifest", dest="manifest_path", default=None)
+    args = parser.parse_args()
+
+    clean_directory(args.pattern, args.output_dir, workers=args.workers, output_format=args.output_format,
+                    chunk_size=args.chunk_size, manifest_path=args.manifest_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark of the data cleaning pipeline on synthetic dirty csv files
+python benchmark.py --sizes 10000 1000000 10000000 --modes steps fused streaming
+Results are saved as json (one file per run, named by commit), compare two runs with
+python benchmark.py --compare ../benchmarks/results/<old>.json ../benchmarks/results/<new>.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_cleaner import DataCleaner, BASE_DIR, logger
+from instrumentation import peak_rss_mb
+
+COLUMNS = ["Order ID", "Product", "Quantity Ordered", "Price Each", "Order Date", "Purchase Address"]
+PRODUCTS = np.array(["USB-C Charging Cable", "Lightning Charging Cable", "Wired Headphones", "27in FHD Monitor",
+                     "AAA Batteries (4-pack)", "Macbook Pro Laptop", "ThinkPad Laptop", "Google Phone"])
+PRICES = np.array([11.95, 14.95, 11.99, 149.99, 2.99, 1700.0, 999.99, 600.0])
+CITIES = np.array(["Dallas, TX 75001", "Boston, MA 02215", "Los Angeles, CA 90001", "San Francisco, CA 94016"])
+# Benchmark runs without profiling and cache, instrumentation records the steps
+BENCHMARK_CONFIG = {
+    "profiling": {"mode": "off"},
+    "cache": {"enabled": False},
+    "instrumentation": {"enabled": True, "tracemalloc": False},
+}
+
+
+def generate_dirty_csv(path:str, n_rows:int, seed:int=42, block_size:int=1_000_000):
+    """
+    Write a sales csv with repeated header rows (0.3%), empty rows (0.3%), duplicates (1%)
+    and a mixed-type column (0.5% text in Quantity Ordered), generated block by block
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, block_size):
+        n = min(block_size, n_rows - start)
+        product = rng.integers(0, len(PRODUCTS), n)
+        dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, n), unit="min")
+        df = pd.DataFrame({
+            "Order ID": np.arange(start, start + n) + 141234,
+            "Product": PRODUCTS[product],
+            "Quantity Ordered": rng.integers(1, 10, n).astype(str).astype(object),
+            "Price Each": PRICES[product],
+            "Order Date": dates.strftime("%m/%d/%y %H:%M"),
+            "Purchase Address": (rng.integers(1, 999, n).astype(str).astype(object) + " Main St, "
+                                 + CITIES[rng.integers(0, len(CITIES), n)]),
+        })
+        df.loc[rng.random(n) < 0.005, "Quantity Ordered"] = "n/a"
+
+        # Duplicates of random earlier rows of this block
+        duplicates = df.iloc[rng.integers(0, n, n // 100)]
+        df = pd.concat([df, duplicates], ignore_index=True).astype(object)
+        # Repeated headers and empty rows at random positions
+        df.loc[rng.random(len(df)) < 0.003] = COLUMNS
+        df.loc[rng.random(len(df)) < 0.003] = np.nan
+        df = df.sample(frac=1, random_state=seed + start)
+
+        df.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(input_path:str, output_path:str, config_path:str, mode:str, chunk_size:int):
+    """Run the full pipeline once (in a fresh worker process, so peak RSS belongs to this run)"""
+    cleaner = DataCleaner(input_path, output_path, chunk_size=chunk_size if mode == "streaming" else None,
+                          config_path=config_path)
+    cleaner.cleaning_config['fused_plan'] = mode == "fused"
+    cleaner.metrics_path = Path(output_path).with_suffix(".metrics.jsonl")
+    start = time.perf_counter()
+    cleaner.process_cleaning()
+    # Include loading, done in __init__ outside of process_cleaning
+    total_s = time.perf_counter() - cleaner.recorder.start_time
+
+    steps = []
+    for record in cleaner.recorder.records.values():
+        # Loading starts without rows, use the loaded rows instead
+        rows = max(record["rows_in"], record["rows_out"])
+        steps.append({
+            "step": record["step"],
+            "wall_s": record["wall_s"],
+            "cpu_s": record["cpu_s"],
+            "rows_in": record["rows_in"],
+            "rows_out": record["rows_out"],
+            "rows_per_s": rows / record["wall_s"] if record["wall_s"] else None,
+            "rss_delta_mb": record["rss_delta_mb"],
+        })
+    return {
+        "mode": mode,
+        "rows_in": cleaner.rows_in,
+        "rows_out": cleaner.rows_out,
+        "total_s": total_s,
+        "process_cleaning_s": time.perf_counter() - start,
+        "rows_per_s": cleaner.rows_in / total_s if total_s else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "steps": steps,
+    }
+
+
+def run_suite(sizes:list, modes:list, data_dir:str, results_dir:str, chunk_size:int=1_000_000):
+    """Generate missing input files, run all sizes and modes and save the results as json"""
+    data_dir = Path(data_dir)
+    results_dir = Path(results_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(BASE_DIR / "../config/cleaning_config.json") as file:
+        config = json.load(file)
+    config.update(BENCHMARK_CONFIG)
+    config_path = data_dir / "benchmark_config.json"
+    with open(config_path, mode="w") as file:
+        json.dump(config, file, indent=2)
+
+    results = []
+    for n_rows in sizes:
+        input_path = data_dir / f"dirty_{n_rows}.csv"
+        if not input_path.exists():
+            logger.info(f"Generate {input_path}")
+            generate_dirty_csv(input_path, n_rows)
+        for mode in modes:
+            # Fresh process per run (spawn) for independent peak memory
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run_benchmark, str(input_path), str(data_dir / f"cleaned_{n_rows}_{mode}.csv"),
+                                         str(config_path), mode, chunk_size).result()
+            result["rows"] = n_rows
+            logger.info(f"{n_rows} rows, {mode}: {result['total_s']:0.2f} s, {result['rows_per_s']:0.0f} rows/s, "
+                        f"peak RSS {result['peak_rss_mb']} MB")
+            results.append(result)
+
+    commit = git_commit()
+    benchmark = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    results_path = results_dir / f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}_{commit or 'nogit'}.json"
+    with open(results_path, mode="w") as file:
+        json.dump(benchmark, file, indent=2)
+    logger.info(f"Benchmark results saved in {results_path}")
+    return benchmark
+
+
+def compare(old_path:str, new_path:str):
+    """Print rows/s of two benchmark runs side by side"""
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    old_results = {(result["rows"], result["mode"]): result for result in old["results"]}
+    print(f"{'rows':>10} {'mode':<10} {old['commit'] or 'old':>12} {new['commit'] or 'new':>12} {'change':>8}")
+    for result in new["results"]:
+        previous = old_results.get((result["rows"], result["mode"]))
+        if previous is None:
+            continue
+        change = result["rows_per_s"] / previous["rows_per_s"] - 1
+        print(f"{result['rows']:>10} {result['mode']:<10} {previous['rows_per_s']:>12.0f} {result['rows_per_s']:>12.0f} "
+              f"{change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data cleaning pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--modes", nargs="+", default=["steps", "fused", "streaming"],
+                        choices=["steps", "fused", "streaming"])
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--data-dir", default=str(BASE_DIR / "../benchmarks/data"))
+    parser.add_argument("--results-dir", default=str(BASE_DIR / "../benchmarks/results"))
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_suite(args.sizes, args.modes, args.data_dir, args.results_dir, chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
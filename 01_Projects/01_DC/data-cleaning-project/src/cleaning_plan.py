@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+
+from row_hash_index import RowHashIndex
+
+
+def repeated_header_mask(df:pd.DataFrame) -> np.ndarray:
+    """Rows with cell value equal column name in first column (only possible for text columns)"""
+    first_col = df.columns[0]
+    if not (is_object_dtype(df[first_col]) or is_string_dtype(df[first_col])):
+        return np.zeros(len(df), dtype=bool)
+    return df[first_col].str.contains(first_col, na=False).to_numpy(dtype=bool)
+
+
+class CleaningPlan:
+    """
+    Row filters of the cleaning config fused into one boolean mask
+    Gives the same rows as drop_repeated_headers -> drop_empty_rows -> remove_duplicates,
+    but the frame is only filtered (materialized) once.
+    """
+    def __init__(self, cleaning_config:dict):
+        self.drop_repeated_headers = cleaning_config['drop_repeated_headers']
+        self.drop_null_values = cleaning_config['drop_null_values']
+        self.remove_duplicates = cleaning_config['remove_duplicates']
+
+    def row_mask(self, df:pd.DataFrame, row_hash_index:RowHashIndex):
+        """
+        Combined mask of rows to keep
+        :return: (keep mask, dict step name -> mask of removed rows)
+        """
+        keep = np.ones(len(df), dtype=bool)
+        removed = {}
+
+        if self.drop_repeated_headers:
+            repeated = repeated_header_mask(df)
+            keep &= ~repeated
+            removed["repeated headers"] = repeated
+
+        if self.drop_null_values:
+            empty = df.isna().all(axis=1).to_numpy() & keep
+            keep &= ~empty
+            removed["empty"] = empty
+
+        if self.remove_duplicates:
+            # Only rows surviving the previous filters are added to the index
+            duplicated = np.zeros(len(df), dtype=bool)
+            duplicated[keep] = row_hash_index.duplicated_hashes(RowHashIndex.hash_rows(df)[keep])
+            keep &= ~duplicated
+            removed["duplicated"] = duplicated
+
+        return keep, removed
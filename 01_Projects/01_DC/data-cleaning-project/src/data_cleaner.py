@@ -1,28 +1,81 @@
 import pandas as pd
 import json
+import time
 import logging.config
-from ydata_profiling import ProfileReport
+from row_hash_index import RowHashIndex
+from type_inference import correct_dtypes, convert_to_chunk_dtypes, convert_to_dtypes, verify_text_dtypes
+from cleaning_plan import CleaningPlan, repeated_header_mask
+from file_io import file_format, read_data, read_data_chunked, write_data
+from profiling import ProfilingStage
+from result_cache import ResultCache, merge_results
+from instrumentation import StepRecorder, instrumented
+from outliers import OutlierHandler
 
-import os
 from pathlib import Path
-os.chdir(Path(__file__).parent)
+
+# Paths relative to this file, independent of the working directory
+BASE_DIR = Path(__file__).parent
 
 # Load of logging configuration file
-logging.config.fileConfig('../config/logging_config.ini')
+logging.config.fileConfig(BASE_DIR / '../config/logging_config.ini',
+                          defaults={'log_path': (BASE_DIR / '../logs/app.log').as_posix()})
 
 # Create logger
 logger = logging.getLogger(__name__)
 
 
 class DataCleaner:
-    def __init__(self, input_path:str, output_path:str):
-        logger.info(f"Start data cleaning")
+    def __init__(self, input_path:str, output_path:str, chunk_size:int=None, log_context:str=None, report_name:str=None,
+                 config_path:str=None):
+        # Own child logger per file (e.g. in batch mode), logged as data_cleaner.<log_context>
+        self.logger = logger.getChild(log_context) if log_context else logger
+        self.logger.info(f"Start data cleaning")
         self.input_path = input_path
         self.output_path = output_path
-        self.config_path = '../config/cleaning_config.json'
+        self.report_name = report_name
+        self.config_path = config_path or BASE_DIR / '../config/cleaning_config.json'
         self.cleaning_config = self.load_config()
-        self.df = self.load_csv_data()
-        self.df_clean = self.df.copy()
+        self.rows_in = 0
+        self.rows_out = 0
+        self.df = None
+        self.df_clean = None
+        # Cleaned data before outlier handling (cached for appended rows)
+        self.df_typed = None
+        # Timing and memory per step (config instrumentation)
+        instrumentation_config = self.cleaning_config.get('instrumentation') or {}
+        self.recorder = StepRecorder(instrumentation_config.get('enabled', True),
+                                     trace_memory=instrumentation_config.get('tracemalloc', False))
+        self.metrics_path = BASE_DIR / instrumentation_config.get('metrics_path', '../logs/metrics.jsonl')
+        self.recorder.start()
+        # Row fingerprints to find duplicates across chunks and (if persisted) across runs
+        self.row_hash_index = self.create_row_hash_index()
+        self.cleaning_plan = CleaningPlan(self.cleaning_config)
+        self.profiling = ProfilingStage(self.cleaning_config.get('profiling'))
+        self.outlier_handler = OutlierHandler(self.cleaning_config.get('outliers'))
+        # Streaming mode if a chunk size is given (argument overrules config)
+        self.chunk_size = chunk_size or self.cleaning_config.get('chunk_size')
+        # Dtypes inferred on the first chunk, applied to all later chunks (streaming mode)
+        self.chunk_dtypes = None
+        # File formats from config or file extension (csv, parquet, feather)
+        self.input_format = file_format(input_path, self.cleaning_config.get('input_format'))
+        self.output_format = file_format(output_path, self.cleaning_config.get('output_format'))
+        # Cache of cleaned results (not used in streaming mode)
+        cache_config = self.cleaning_config.get('cache') or {}
+        self.result_cache = None
+        if cache_config.get('enabled') and not self.chunk_size:
+            self.result_cache = ResultCache(BASE_DIR / cache_config.get('dir', '../cache'), self.cleaning_config,
+                                            key=cache_config.get('key', 'content'))
+        if self.chunk_size:
+            if self.output_format != "csv":
+                raise ValueError(f"Streaming mode only appends to csv, not {self.output_format}")
+            # Data is read chunk by chunk in process_cleaning_chunked
+            pass
+        elif self.result_cache:
+            # Data is only loaded in process_cleaning if not cached
+            pass
+        else:
+            self.df = self.load_data()
+            self.df_clean = self.df.copy()
 
     def load_config(self):
         try:
@@ -30,141 +83,376 @@ class DataCleaner:
                 self.cleaning_config = json.load(json_data)
                 json_data.close()
         except FileNotFoundError:
-            logger.info(f"Config file {self.config_path} not found")
+            self.logger.info(f"Config file {self.config_path} not found")
         else:
-            logger.info(f"Config file {self.config_path} successfully loaded")
+            self.logger.info(f"Config file {self.config_path} successfully loaded")
             return self.cleaning_config
         return False
 
-    def load_csv_data(self):
-        """Load csv file and return as pandas dataframe"""
-        self.df = pd.read_csv(self.input_path)
-        logger.info(f"Csv file {self.input_path} loaded, {self.df.shape[1]} columns ({self.df.columns.to_list()}), {self.df.shape[0]} rows ")
+    def create_row_hash_index(self):
+        dedup_index_path = self.cleaning_config.get('dedup_index_path')
+        return RowHashIndex(BASE_DIR / dedup_index_path if dedup_index_path else None,
+                            mmap=self.cleaning_config.get('dedup_index_mmap', False),
+                            spill_rows=self.cleaning_config.get('dedup_index_spill_rows'))
+
+    def count_rows(self):
+        """Rows of the current (cleaned) data, used for the instrumentation"""
+        df = self.df_clean if self.df_clean is not None else self.df
+        return 0 if df is None else df.shape[0]
+
+    @instrumented
+    def load_data(self):
+        """Load csv, parquet or feather file and return as pandas dataframe"""
+        self.df = read_data(self.input_path, self.input_format,
+                            columns=self.cleaning_config.get('columns'),
+                            csv_engine=self.cleaning_config.get('csv_engine'),
+                            # Same dtypes as the appended rows read by the result cache
+                            csv_dtype=str if self.result_cache else None)
+        self.logger.info(f"{self.input_format.capitalize()} file {self.input_path} loaded, {self.df.shape[1]} columns ({self.df.columns.to_list()}), {self.df.shape[0]} rows ")
         return self.df
 
     def process_cleaning(self):
-        """Execute the several cleaning steps"""
-        self.drop_repeated_headers()
-        self.drop_empty_rows()
-        self.remove_duplicates()
-        self.correct_data_types()
+        """Execute the several cleaning steps and report timing and memory per step"""
+        df_clean = self.run_cleaning()
+
+        summary = self.recorder.finish(self.metrics_path, {
+            "input": str(self.input_path),
+            "output": str(self.output_path),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out
+        })
+        if summary:
+            self.logger.info(f"Step metrics saved in {self.metrics_path}\n{summary}")
+        return df_clean
+
+    def run_cleaning(self):
+        """Clean in streaming mode, from the result cache or all data at once"""
+        if self.chunk_size:
+            return self.process_cleaning_chunked()
 
+        if self.result_cache:
+            with self.recorder.step("cache_lookup", self.count_rows):
+                cache_lookup = self.result_cache.lookup(self.input_path)
+            if cache_lookup["status"] == "hit":
+                return self.process_cache_hit(cache_lookup)
+            if (cache_lookup["status"] == "append" and self.input_format == "csv"
+                    and not self.cleaning_config.get('columns')):
+                df_clean = self.process_appended_rows(cache_lookup)
+                if df_clean is not None:
+                    return df_clean
+            self.logger.info(f"No cached result for {self.input_path}")
+            self.df = self.load_data()
+            self.df_clean = self.df.copy()
+
+        self.process_steps()
+        self.row_hash_index.save()
+        self.rows_in = self.df.shape[0]
+        self.rows_out = self.df_clean.shape[0]
+        if self.result_cache:
+            self.result_cache.store(self.input_path, cache_lookup, self.df, self.df_clean, self.df_typed,
+                                    self.row_hash_index, self.rows_in)
+
+        # Parallel profiling runs in worker processes while the cleaned data is saved
         self.create_profiles()
 
-        self.save_df_to_csv()
+        self.save_df()
+        if self.profiling.pending():
+            if self.profiling.wait_for_reports:
+                self.wait_for_profiles()
+            else:
+                self.logger.info(f"Profile reports are rendered in the background, see profile_futures")
+        return self.df_clean
+
+    def process_cache_hit(self, cache_lookup:dict):
+        """Input and config unchanged, save the cached result"""
+        self.df_clean, self.rows_in = self.result_cache.read_result(cache_lookup["result_path"])
+        self.rows_out = self.df_clean.shape[0]
+        self.logger.info(f"Input {self.input_path} and config unchanged, cached result {cache_lookup['result_path']} used")
+        self.save_df()
+        return self.df_clean
+
+    def process_appended_rows(self, cache_lookup:dict):
+        """
+        Rows appended to the input since the cached run, clean only the new rows and merge them
+        The new rows get the dtypes of the cached result, outliers are handled on all rows like in a full run.
+        :return: cleaned dataframe, None if the new rows don't fit the dtypes of the cached result
+        """
+        meta = cache_lookup["meta"]
+        self.logger.info(f"Input {self.input_path} grew from {meta['size']} to {cache_lookup['size']} bytes, "
+                         f"clean only appended rows")
+        self.df = self.result_cache.read_tail(self.input_path, meta)
+        self.df_clean = self.df.copy()
+        # Duplicates of already cleaned rows
+        self.row_hash_index.add(self.result_cache.load_fingerprints(meta))
+        self.process_row_steps()
+
+        df_previous = self.result_cache.read_typed(meta)
+        if self.cleaning_config['data_type_correction']:
+            try:
+                with self.recorder.step("convert_appended_rows", self.count_rows):
+                    self.df_clean, dtypes = convert_to_dtypes(self.df_clean, df_previous.dtypes.to_dict(),
+                                                              date_format=self.cleaning_config['date_format'])
+                    merged = merge_results(df_previous, self.df_clean)
+                    verify_text_dtypes(merged, dtypes, self.cleaning_config.get('category_ratio', 0.5))
+            except ValueError as e:
+                self.logger.info(f"Appended rows don't fit the dtypes of the cached result ({e}), clean all rows")
+                self.row_hash_index = self.create_row_hash_index()
+                return None
+        else:
+            merged = merge_results(df_previous, self.df_clean)
+        rows_appended = self.df_clean.shape[0]
+        self.df_clean = merged
+        self.handle_outliers()
+        self.row_hash_index.save()
+
+        _, rows_in_previous = self.result_cache.read_result(meta["result_path"])
+        self.rows_in = rows_in_previous + self.df.shape[0]
+        self.rows_out = self.df_clean.shape[0]
+        self.result_cache.store(self.input_path, cache_lookup, self.df, self.df_clean, self.df_typed,
+                                self.row_hash_index, self.rows_in)
+        self.logger.info(f"{rows_appended} appended rows merged into cached result")
+        if (self.cleaning_config.get('cache') or {}).get('verify_append'):
+            self.verify_appended_result()
+        self.save_df()
+        return self.df_clean
+
+    def verify_appended_result(self):
+        """
+        Clean the whole input again without the cache and check that the merged result is identical
+        (debug option cache verify_append)
+        """
+        df, df_clean, df_typed, row_hash_index = self.df, self.df_clean, self.df_typed, self.row_hash_index
+        self.row_hash_index = RowHashIndex()
+        self.df = self.load_data()
+        self.df_clean = self.df.copy()
+        self.process_steps()
+        df_full = self.df_clean.reset_index(drop=True)
+        self.df, self.df_clean, self.df_typed, self.row_hash_index = df, df_clean, df_typed, row_hash_index
+
+        pd.testing.assert_frame_equal(self.df_clean, df_full)
+        self.logger.info(f"Merged result identical to a full clean of {self.input_path}")
+
+    def process_steps(self, fused:bool=None):
+        """Execute the cleaning steps on df, either step by step or as fused plan (default from config fused_plan)"""
+        self.process_row_steps(fused)
+        self.correct_data_types()
+        self.handle_outliers()
+
+    def process_row_steps(self, fused:bool=None):
+        """Drop repeated headers, empty and duplicated rows (each row on its own, no column statistics)"""
+        if fused is None:
+            fused = self.cleaning_config.get('fused_plan')
+        if fused:
+            self.process_fused_plan()
+        else:
+            self.drop_repeated_headers()
+            self.drop_empty_rows()
+            self.remove_duplicates()
+
+    def process_fused_plan(self):
+        """Drop repeated headers, empty and duplicated rows with one combined mask"""
+        self.logger.info(f"Apply fused cleaning plan")
+        with self.recorder.step("fused_row_mask", self.count_rows):
+            keep, removed = self.cleaning_plan.row_mask(self.df, self.row_hash_index)
+            self.df_clean = self.df[keep]
+        for name, mask in removed.items():
+            self.log_removed_rows(name, mask, self.df.index)
+
+    def compare_cleaning_paths(self):
+        """
+        Run step by step and fused cleaning on the loaded data
+        Check that both give identical results and log the timings
+        """
+        row_hash_index = self.row_hash_index
+        results = {}
+        seconds = {}
+        for fused in (False, True):
+            self.row_hash_index = RowHashIndex()
+            self.df_clean = self.df.copy()
+            start = time.perf_counter()
+            self.process_steps(fused)
+            seconds[fused] = time.perf_counter() - start
+            results[fused] = self.df_clean
+        self.row_hash_index = row_hash_index
+
+        pd.testing.assert_frame_equal(results[False], results[True])
+        self.logger.info(f"Identical results, step by step {seconds[False]:0.3f} s, fused {seconds[True]:0.3f} s "
+                         f"(speedup {seconds[False] / max(seconds[True], 1e-9):0.2f}x)")
+        return {"steps": seconds[False], "fused": seconds[True]}
+
+    def process_cleaning_chunked(self):
+        """
+        Execute the row-wise cleaning steps chunk by chunk (streaming mode)
+        Each cleaned chunk is appended to the output file, so memory is bounded by chunk size not file size
+        Column dtypes are inferred on the first chunk and applied to all later chunks
+        """
+        self.logger.info(f"Streaming mode, reading {self.input_path} in chunks of {self.chunk_size} rows")
+        self.logger.info(f"No profiles created in streaming mode")
+
+        reader = read_data_chunked(self.input_path, self.chunk_size, self.input_format,
+                                   columns=self.cleaning_config.get('columns'))
+        for i, chunk in enumerate(reader):
+            self.logger.info(f"Clean chunk {i} ({chunk.shape[0]} rows)")
+            self.df = chunk
+            self.df_clean = chunk
+
+            self.process_steps()
+
+            self.append_chunk_to_csv(header=(i == 0))
+            self.rows_in += self.df.shape[0]
+            self.rows_out += self.df_clean.shape[0]
+
+        self.row_hash_index.save()
+        self.logger.info(f"File {self.output_path} saved, {self.rows_out} of {self.rows_in} rows")
+        # Only the last chunk is kept in memory
         return self.df_clean
 
+    @instrumented
     def drop_repeated_headers(self):
         """Drop repeated headers"""
         if self.cleaning_config['drop_repeated_headers']:
-            logger.info(f"Find repeated headers")
-            index_before = self.df_clean.index.to_list()
-            cols = self.df_clean.columns.to_list()
+            self.logger.info(f"Find repeated headers")
             # Sort out entire rows for cells with value equal column name in first column
-            self.df_clean = self.df[self.df[cols[0]].str.contains(cols[0], na=False) == False]
-            index_clean = self.df_clean.index.to_list()
-            repeated_headers_index = list(set(index_before).difference(set(index_clean)))
-            repeated_values = [self.df.loc[idx, cols[0]] for idx in repeated_headers_index]
-            logger.info(f"Found {len(repeated_headers_index)} repeated headers rows, \n{repeated_headers_index}")
+            repeated = repeated_header_mask(self.df)
+            self.df_clean = self.df[~repeated]
+            self.log_removed_rows("repeated headers", repeated, self.df.index)
         else:
-            logger.info(f"No dropping of repeated headers in respect to config settings")
+            self.logger.info(f"No dropping of repeated headers in respect to config settings")
 
+    @instrumented
     def drop_empty_rows(self):
         """Drop empty rows"""
         if self.cleaning_config['drop_null_values']:
-            logger.info(f"Find empty rows")
-            index_before = self.df_clean.index.to_list()
-            self.df_clean = self.df_clean.dropna(axis=0, how="all")
-            index_clean = self.df_clean.index.to_list()
-            empty_index = list(set(index_before).difference(set(index_clean)))
-            empty_percentage = len(empty_index) / len(index_before) * 100
-
-            logger.info(f"Found {len(empty_index)} empty rows ({empty_percentage:0.1f}%), \n{empty_index}")
+            self.logger.info(f"Find empty rows")
+            empty = self.df_clean.isna().all(axis=1).to_numpy()
+            index_before = self.df_clean.index
+            self.df_clean = self.df_clean[~empty]
+            self.log_removed_rows("empty", empty, index_before)
         else:
-            logger.info(f"No dropping of empty rows in respect to config settings")
+            self.logger.info(f"No dropping of empty rows in respect to config settings")
 
+    @instrumented
     def remove_duplicates(self):
-        """Drop duplicated rows"""
+        """Drop duplicated rows (also across chunks and runs, see RowHashIndex)"""
         if self.cleaning_config['remove_duplicates']:
-            logger.info(f"Find duplicate rows")
-            index_before = self.df_clean.index.to_list()
-            self.df_clean = self.df_clean.drop_duplicates()
-            index_clean = self.df_clean.index.to_list()
-            duplicates_index = list(set(index_before).difference(set(index_clean)))
-            duplicates_percentage = len(duplicates_index) / len(index_before) * 100
-
-            logger.info(f"Found {len(duplicates_index)} duplicated rows ({duplicates_percentage:0.1f}%), \n{duplicates_index}")
+            self.logger.info(f"Find duplicate rows")
+            duplicated = self.row_hash_index.duplicated(self.df_clean)
+            index_before = self.df_clean.index
+            self.df_clean = self.df_clean[~duplicated]
+            self.log_removed_rows("duplicated", duplicated, index_before)
         else:
-            logger.info(f"No removing of duplicated rows in respect to config settings")
+            self.logger.info(f"No removing of duplicated rows in respect to config settings")
 
+    def log_removed_rows(self, name:str, mask, index):
+        """
+        Log number of rows removed by a boolean mask
+        Indices of removed rows only with config option log_removed_indices (debug)
+        """
+        n_removed = int(mask.sum())
+        percentage = n_removed / max(len(mask), 1) * 100
+        self.logger.info(f"Found {n_removed} {name} rows ({percentage:0.1f}%)")
+        if self.cleaning_config.get('log_removed_indices'):
+            self.logger.debug(f"Index of {name} rows:\n{index[mask].to_list()}")
+
+    @instrumented
     def correct_data_types(self):
         """
-        Automatic data type correction
-        # int -> float -> date -> string
+        Automatic data type correction to the narrowest safe type (see type_inference)
+        # int8/16/32/64 -> float32/64 -> datetime -> category -> string
         """
         if self.cleaning_config['data_type_correction']:
-            logger.info(f"Correct column data types")
-
-            logger.info(f"Data types before:\n"+str(self.df_clean.dtypes))
-
-            for col in self.df_clean.columns.to_list():
-                try:
-                    self.df_clean[col] = self.df_clean[col].astype('int32')
-                except ValueError:
-                    pass
-                else:
-                    logger.info(f"{col} converted to int32")
-                    continue
-
-                try:
-                    self.df_clean[col] = self.df_clean[col].astype('float64')
-                except ValueError:
-                    pass
-                else:
-                    logger.info(f"{col} converted to float64")
-                    continue
-
-                try:
-                    self.df_clean[col] = pd.to_datetime(self.df_clean[col], format=self.cleaning_config['date_format'])
-                except ValueError:
-                    pass
-                else:
-                    logger.info(f"{col} converted to datetime")
-                    continue
-
-                try:
-                    self.df_clean[col] = self.df_clean[col].astype('str')
-                except ValueError:
-                    logger.info(f"{col} not possible to convert")
-                else:
-                    logger.info(f"{col} converted to str")
-                    continue
-            logger.info(f"Data types after correction:\n" + str(self.df_clean.dtypes))
-
-    def save_df_to_csv(self):
-        """
-        Save (cleaned) pandas dataframe to csv
-        """
-        self.df.to_csv(self.output_path, index=False)
-        logger.info(f"File {self.output_path} saved, {self.df.shape[1]} columns ({self.df.columns.to_list()}), {self.df.shape[0]} rows")
+            self.logger.info(f"Correct column data types")
+
+            self.logger.info(f"Data types before:\n"+str(self.df_clean.dtypes))
 
+            memory_before = self.df_clean.memory_usage(deep=True).sum()
+            if self.chunk_dtypes is not None:
+                # Same dtypes for every chunk, otherwise the csv formats of a column change between chunks
+                self.df_clean, dtypes = convert_to_chunk_dtypes(self.df_clean, self.chunk_dtypes,
+                                                                self.cleaning_config['date_format'])
+            else:
+                self.df_clean, dtypes, _ = correct_dtypes(
+                    self.df_clean,
+                    date_format=self.cleaning_config['date_format'],
+                    sample_size=self.cleaning_config.get('type_inference_sample_size'),
+                    category_ratio=self.cleaning_config.get('category_ratio', 0.5))
+                if self.chunk_size and len(self.df_clean):
+                    self.chunk_dtypes = self.df_clean.dtypes.to_dict()
+            memory_saved = memory_before - self.df_clean.memory_usage(deep=True).sum()
+            for col, dtype in dtypes.items():
+                self.logger.info(f"{col} converted to {dtype}")
+
+            self.logger.info(f"Data types after correction:\n" + str(self.df_clean.dtypes))
+            self.logger.info(f"Memory usage reduced by {memory_saved / 1024**2:0.2f} MB")
+
+    @instrumented
+    def handle_outliers(self):
+        """
+        Clip, drop or flag outliers in numeric columns (config outliers)
+        With the shipped action flag the output gets an extra bool column outliers.flag_column (default is_outlier),
+        values and rows stay unchanged. Action clip keeps the input columns but changes values.
+        """
+        self.df_typed = self.df_clean
+        if self.cleaning_config['handle_outliers']:
+            handler = self.outlier_handler
+            self.logger.info(f"Find outliers ({handler.method}, threshold {handler.threshold}, action {handler.action})")
+            index_before = self.df_clean.index
+            self.df_clean, outlier_rows = handler.apply(self.df_clean, streaming=bool(self.chunk_size))
+            if handler.action == "drop":
+                self.log_removed_rows("outlier", outlier_rows, index_before)
+            else:
+                self.logger.info(f"Found {int(outlier_rows.sum())} rows with outliers, {handler.action} them"
+                                 + (f" in column {handler.flag_column}" if handler.action == "flag" else ""))
+        else:
+            self.logger.info(f"No handling of outliers in respect to config settings")
+
+    @instrumented
+    def save_df(self):
+        """
+        Save cleaned pandas dataframe as csv, parquet or feather (parquet and feather keep the corrected dtypes)
+        """
+        write_data(self.df_clean, self.output_path, self.output_format)
+        self.logger.info(f"File {self.output_path} saved, {self.df_clean.shape[1]} columns ({self.df_clean.columns.to_list()}), {self.df_clean.shape[0]} rows")
+
+    @instrumented
+    def append_chunk_to_csv(self, header:bool=False):
+        """
+        Append cleaned chunk to csv, first chunk (header=True) creates the file
+        """
+        mode = "w" if header else "a"
+        self.df_clean.to_csv(self.output_path, mode=mode, header=header, index=False)
+
+    @instrumented
     def create_profiles(self):
-        # Original File
-        profile = ProfileReport(self.df)
-        # TODO file path based on input_file or additional user input
-        original_profile_path = "../reports/report_original.html"
-        profile.to_file(original_profile_path)
-        logger.info(f"Report for original data saved in {original_profile_path}")
-
-        profile = ProfileReport(self.df_clean)
-        # TODO file path based on output_file or additional user input
-        cleaned_profile_path = "../reports/report_cleaned.html"
-        profile.to_file(cleaned_profile_path)
-        logger.info(f"Report for cleaned data saved in {cleaned_profile_path}")
+        """Create profile reports for original and cleaned data (config profiling)"""
+        if self.profiling.mode == "off":
+            self.logger.info(f"No profiles created in respect to config settings")
+            return
+
+        # Report file names based on report_name (e.g. input file name in batch mode)
+        prefix = f"{self.report_name}_" if self.report_name else ""
+        original_profile_path = BASE_DIR / f"../reports/{prefix}report_original.html"
+        cleaned_profile_path = BASE_DIR / f"../reports/{prefix}report_cleaned.html"
+        self.logger.info(f"Create {self.profiling.mode} profiles"
+                    + (" in parallel worker processes" if self.profiling.parallel else ""))
+        report_paths = self.profiling.start({original_profile_path: self.df, cleaned_profile_path: self.df_clean})
+        for report_path in report_paths:
+            self.logger.info(f"Report saved in {report_path}")
+
+    @property
+    def profile_futures(self):
+        """Futures of the profile reports rendered in parallel (result: report path)"""
+        return self.profiling.futures
+
+    @instrumented
+    def wait_for_profiles(self):
+        """Wait for profile reports created in parallel (call before the process exits)"""
+        for report_path in self.profiling.wait():
+            self.logger.info(f"Report saved in {report_path}")
 
 def main():
-    input_file = '../data/my_data.csv'
-    output_file = '../data/my_cleaned_data.csv'
+    input_file = BASE_DIR / '../data/my_data.csv'
+    output_file = BASE_DIR / '../data/my_cleaned_data.csv'
 
     mycleaner = DataCleaner(input_file, output_file)
     df_clean = mycleaner.process_cleaning()
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pandas as pd
+
+# File extension -> file format
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+
+
+def file_format(path:str, fmt:str=None) -> str:
+    """Return file format from config (fmt) or file extension"""
+    if fmt:
+        return fmt
+    suffix = Path(path).suffix.lower()
+    if suffix not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format for {path}, use one of {list(FILE_FORMATS)} or set the format in the config")
+    return FILE_FORMATS[suffix]
+
+
+def read_data(path:str, fmt:str=None, columns:list=None, csv_engine:str=None, csv_dtype=None) -> pd.DataFrame:
+    """
+    Read csv, parquet or feather (Arrow IPC) file
+    :param columns: Read only these columns (column projection)
+    :param csv_engine: pandas csv engine, e.g. "pyarrow" for multithreaded parsing
+    :param csv_dtype: dtype for csv columns, e.g. str to skip pandas type guessing
+    """
+    fmt = file_format(path, fmt)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns, engine=csv_engine, dtype=csv_dtype)
+    elif fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        return pd.read_feather(path, columns=columns)
+    raise ValueError(f"Unknown file format {fmt}")
+
+
+def read_data_chunked(path:str, chunk_size:int, fmt:str=None, columns:list=None):
+    """
+    Read csv, parquet or feather (Arrow IPC) file as iterator of dataframes with chunk_size rows
+    Csv columns are read as str, so every chunk has the same dtypes before type correction
+    """
+    fmt = file_format(path, fmt)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, usecols=columns)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "feather":
+        import pyarrow as pa
+
+        # Memory mapped, batches are only copied when converted to pandas
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        if columns:
+            table = table.select(columns)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unknown file format {fmt}")
+
+
+def write_data(df:pd.DataFrame, path:str, fmt:str=None):
+    """Write dataframe as csv, parquet or feather (Arrow IPC), columnar formats keep the dtypes"""
+    fmt = file_format(path, fmt)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unknown file format {fmt}")
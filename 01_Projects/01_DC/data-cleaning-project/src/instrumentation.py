@@ -0,0 +1,135 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not recorded there
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process in MB (None if not available)"""
+    if resource is None:
+        return None
+    # ru_maxrss in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """Current resident set size of the process in MB (None if not available, read from /proc on Linux)"""
+    try:
+        with open("/proc/self/statm") as file:
+            resident_pages = int(file.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StepRecorder:
+    """
+    Records wall time, CPU time, RSS delta, tracemalloc peak delta and rows in/out per cleaning step
+    The RSS delta is the change of the current RSS over the step (memory kept by the step), the
+    tracemalloc peak delta also shows temporary allocations. The process peak RSS is recorded per run.
+    Repeated steps (e.g. per chunk in streaming mode) are summed up, memory deltas keep the maximum.
+    """
+    def __init__(self, enabled:bool=True, trace_memory:bool=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records = {}
+        self.start_time = None
+
+    def start(self):
+        self.records = {}
+        self.start_time = time.perf_counter()
+        if self.enabled and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def step(self, name:str, count_rows):
+        """
+        Record one step
+        :param count_rows: Function returning the current number of rows
+        """
+        if not self.enabled:
+            yield
+            return
+
+        rows_in = count_rows()
+        rss_before = current_rss_mb()
+        memory_before = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = self.records.setdefault(name, {
+                "step": name, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                "rows_in": 0, "rows_out": 0, "rss_delta_mb": None, "tracemalloc_peak_mb": None
+            })
+            record["calls"] += 1
+            record["wall_s"] += time.perf_counter() - wall_start
+            record["cpu_s"] += time.process_time() - cpu_start
+            record["rows_in"] += rows_in
+            record["rows_out"] += count_rows()
+            rss_after = current_rss_mb()
+            if rss_before is not None and rss_after is not None:
+                rss_delta = rss_after - rss_before
+                if record["rss_delta_mb"] is None or rss_delta > record["rss_delta_mb"]:
+                    record["rss_delta_mb"] = rss_delta
+            if memory_before is not None:
+                peak_delta = (tracemalloc.get_traced_memory()[1] - memory_before) / 1024**2
+                record["tracemalloc_peak_mb"] = max(record["tracemalloc_peak_mb"] or 0, peak_delta)
+
+    def finish(self, metrics_path:str, run_info:dict=None) -> str:
+        """
+        Append the records of this run as one JSON line to metrics_path
+        :return: summary table
+        """
+        if not self.enabled:
+            return ""
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        metrics = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            **(run_info or {}),
+            "total_wall_s": time.perf_counter() - self.start_time,
+            "peak_rss_mb": peak_rss_mb(),
+            "steps": list(self.records.values())
+        }
+        with open(metrics_path, mode="a") as file:
+            file.write(json.dumps(metrics) + "\n")
+        return self.summary_table(metrics)
+
+    @staticmethod
+    def summary_table(metrics:dict) -> str:
+        def fmt(value, digits=2):
+            return "-" if value is None else f"{value:.{digits}f}"
+
+        lines = [f"{'step':<24}{'calls':>6}{'wall s':>10}{'cpu s':>10}{'rows in':>12}{'rows out':>12}"
+                 f"{'rss +MB':>10}{'trace MB':>10}"]
+        for record in metrics["steps"]:
+            lines.append(f"{record['step']:<24}{record['calls']:>6}{fmt(record['wall_s'], 3):>10}"
+                         f"{fmt(record['cpu_s'], 3):>10}{record['rows_in']:>12}{record['rows_out']:>12}"
+                         f"{fmt(record['rss_delta_mb'], 1):>10}{fmt(record['tracemalloc_peak_mb'], 1):>10}")
+        lines.append(f"{'total':<24}{'':>6}{fmt(metrics['total_wall_s'], 3):>10}"
+                     f"{'':>10}{'':>12}{'':>12}{'peak ' + fmt(metrics['peak_rss_mb'], 1):>10}")
+        return "\n".join(lines)
+
+
+def instrumented(method):
+    """Record a DataCleaner method as step (rows counted on df_clean, or df if not yet available)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.recorder.step(method.__name__, self.count_rows):
+            return method(self, *args, **kwargs)
+    return wrapper
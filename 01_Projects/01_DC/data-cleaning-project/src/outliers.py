@@ -0,0 +1,205 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+OUTLIER_METHODS = ("iqr", "zscore", "mad")
+OUTLIER_ACTIONS = ("clip", "drop", "flag")
+# Scale factor to make the MAD comparable to the standard deviation of normal distributed data
+MAD_SCALE = 1.4826
+
+
+def weighted_quantiles(points:np.ndarray, weights:np.ndarray, levels:np.ndarray) -> np.ndarray:
+    """
+    Quantiles of weighted points for all columns at once (linear interpolation between the weight centers)
+    NaN points are ignored
+    :param points: (n, columns)
+    :param weights: (n, columns)
+    :return: (len(levels), columns)
+    """
+    weights = np.where(np.isnan(points), 0, weights)
+    order = np.argsort(points, axis=0)
+    points = np.take_along_axis(points, order, axis=0)
+    weights = np.take_along_axis(weights, order, axis=0)
+    cum_weights = np.cumsum(weights, axis=0)
+    total = cum_weights[-1]
+    n_valid = (weights > 0).sum(axis=0)
+    centers = cum_weights - weights / 2
+    targets = levels[:, None] * total[None, :]
+
+    # Interpolate between the last center below and the first center above the target
+    upper = (centers[None, :, :] < targets[:, None, :]).sum(axis=1)
+    upper = np.clip(upper, 0, np.maximum(n_valid - 1, 0))
+    lower = np.maximum(upper - 1, 0)
+    center_lower = np.take_along_axis(centers, lower, axis=0)
+    center_upper = np.take_along_axis(centers, upper, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(center_upper > center_lower,
+                            (targets - center_lower) / (center_upper - center_lower), 0)
+    fraction = np.clip(fraction, 0, 1)
+    point_lower = np.take_along_axis(points, lower, axis=0)
+    point_upper = np.take_along_axis(points, upper, axis=0)
+    result = point_lower + fraction * (point_upper - point_lower)
+    result[:, total == 0] = np.nan
+    return result
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantile summary of many columns (k quantile points and a count per column)
+    Used in streaming mode, so quantiles never need a second read of the file.
+    """
+    def __init__(self, k:int=200):
+        # Each point represents 1/k of the values, taken at the center of its share
+        self.levels = (np.arange(k) + 0.5) / k
+        self.points = None
+        self.counts = None
+
+    def update(self, values:np.ndarray):
+        """Add a chunk of values (rows, columns)"""
+        if len(values) == 0:
+            return
+        counts = (~np.isnan(values)).sum(axis=0)
+        with warnings.catch_warnings():
+            # Columns without values give NaN points (weight 0)
+            warnings.simplefilter("ignore", RuntimeWarning)
+            points = np.nanquantile(values, self.levels, axis=0)
+        self.merge_summary(points, counts)
+
+    def merge(self, other:"QuantileSketch"):
+        if other.points is not None:
+            self.merge_summary(other.points, other.counts)
+
+    def merge_summary(self, points:np.ndarray, counts:np.ndarray):
+        if self.points is None:
+            self.points, self.counts = points, counts
+            return
+        all_points = np.vstack([self.points, points])
+        weights = np.vstack([np.broadcast_to(self.counts / len(self.points), self.points.shape),
+                             np.broadcast_to(counts / len(points), points.shape)])
+        self.points = weighted_quantiles(all_points, weights, self.levels)
+        self.counts = self.counts + counts
+
+    def weights(self) -> np.ndarray:
+        return np.broadcast_to(self.counts / len(self.points), self.points.shape)
+
+    def quantiles(self, levels) -> np.ndarray:
+        return weighted_quantiles(self.points, self.weights(), np.asarray(levels, dtype="float64"))
+
+
+class RunningMoments:
+    """Mergeable count, mean and variance of many columns (Chan's parallel algorithm)"""
+    def __init__(self):
+        self.count = None
+        self.mean = None
+        self.m2 = None
+
+    def update(self, values:np.ndarray):
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        total = np.where(valid, values, 0).sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros(values.shape[1]), where=count > 0)
+        m2 = (np.where(valid, values - mean, 0) ** 2).sum(axis=0)
+        if self.count is None:
+            self.count, self.mean, self.m2 = count, mean, m2
+            return
+        new_count = self.count + count
+        delta = mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(new_count > 0, self.mean + delta * count / new_count, 0)
+            self.m2 = np.where(new_count > 0, self.m2 + m2 + delta ** 2 * self.count * count / new_count, 0)
+        self.count = new_count
+
+    def std(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.m2 / self.count)
+
+
+class OutlierHandler:
+    """
+    Outlier handling of numeric columns (config "outliers"), vectorized over all columns at once
+    method: iqr (q1/q3 -/+ threshold * IQR), zscore (mean -/+ threshold * std) or mad (median -/+ threshold * MAD)
+    action: clip values to the bounds, drop rows or flag rows in an extra bool column flag_column (default is_outlier)
+    In streaming mode the bounds come from a sketch of all chunks seen so far (including the current one).
+    """
+    def __init__(self, outlier_config:dict=None):
+        outlier_config = outlier_config or {}
+        self.method = outlier_config.get("method", "iqr")
+        self.action = outlier_config.get("action", "flag")
+        if self.method not in OUTLIER_METHODS:
+            raise ValueError(f"Unknown outlier method {self.method}, use one of {OUTLIER_METHODS}")
+        if self.action not in OUTLIER_ACTIONS:
+            raise ValueError(f"Unknown outlier action {self.action}, use one of {OUTLIER_ACTIONS}")
+        default_threshold = {"iqr": 1.5, "zscore": 3.0, "mad": 3.5}[self.method]
+        self.threshold = outlier_config.get("threshold") or default_threshold
+        self.columns = outlier_config.get("columns")
+        self.flag_column = outlier_config.get("flag_column") or "is_outlier"
+        # Streaming state
+        self.sketch = QuantileSketch()
+        self.moments = RunningMoments()
+
+    def numeric_values(self, df:pd.DataFrame):
+        """Return (numeric columns present in df, positions in self.columns, values as float matrix)"""
+        if self.columns is None:
+            self.columns = [col for col in df.columns if is_numeric_dtype(df[col]) and not is_bool_dtype(df[col])]
+        present = [col for col in self.columns
+                   if col in df.columns and is_numeric_dtype(df[col]) and not is_bool_dtype(df[col])]
+        positions = [self.columns.index(col) for col in present]
+        values = np.full((len(df), len(self.columns)), np.nan)
+        values[:, positions] = df[present].to_numpy(dtype="float64", na_value=np.nan)
+        return present, positions, values
+
+    def bounds(self, values:np.ndarray, streaming:bool=False):
+        """Lower and upper bound per column"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if self.method == "zscore":
+                if streaming:
+                    self.moments.update(values)
+                    center, spread = self.moments.mean, self.moments.std()
+                else:
+                    center, spread = np.nanmean(values, axis=0), np.nanstd(values, axis=0)
+                return center - self.threshold * spread, center + self.threshold * spread
+
+            if streaming:
+                self.sketch.update(values)
+            if self.method == "iqr":
+                q1, q3 = self.sketch.quantiles([0.25, 0.75]) if streaming else np.nanquantile(values, [0.25, 0.75], axis=0)
+                iqr = q3 - q1
+                return q1 - self.threshold * iqr, q3 + self.threshold * iqr
+
+            # mad
+            if streaming:
+                median = self.sketch.quantiles([0.5])[0]
+                mad = weighted_quantiles(np.abs(self.sketch.points - median), self.sketch.weights(), np.array([0.5]))[0]
+            else:
+                median = np.nanmedian(values, axis=0)
+                mad = np.nanmedian(np.abs(values - median), axis=0)
+            return median - self.threshold * MAD_SCALE * mad, median + self.threshold * MAD_SCALE * mad
+
+    def apply(self, df:pd.DataFrame, streaming:bool=False):
+        """
+        Handle outliers in df
+        :return: (handled dataframe, boolean mask of rows with at least one outlier)
+        """
+        present, positions, values = self.numeric_values(df)
+        if not present:
+            return df, np.zeros(len(df), dtype=bool)
+        lower, upper = self.bounds(values, streaming)
+        outlier = (values < lower) | (values > upper)
+        outlier_rows = outlier.any(axis=1)
+
+        if self.action == "drop":
+            return df[~outlier_rows], outlier_rows
+        if self.action == "flag":
+            return df.assign(**{self.flag_column: outlier_rows}), outlier_rows
+
+        # clip, integer columns get integer bounds to keep their dtype
+        is_int = np.array([is_integer_dtype(df[col]) if col in present else False for col in self.columns])
+        lower = np.where(is_int, np.ceil(lower), lower)
+        upper = np.where(is_int, np.floor(upper), upper)
+        clipped = np.where(outlier, np.clip(values, lower, upper), values)
+        df = df.copy()
+        df[present] = pd.DataFrame(clipped[:, positions], columns=present, index=df.index).astype(df[present].dtypes.to_dict())
+        return df, outlier_rows
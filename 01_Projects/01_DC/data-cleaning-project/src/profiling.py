@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+PROFILING_MODES = ("off", "minimal", "full")
+
+
+def create_profile(df:pd.DataFrame, report_path:str, minimal:bool=False):
+    """Create ydata profile report and save it as html (runs in a worker process if parallel)"""
+    # Imported here, profiling is optional and ydata_profiling is slow to import
+    from ydata_profiling import ProfileReport
+
+    profile = ProfileReport(df, minimal=minimal)
+    profile.to_file(report_path)
+    return report_path
+
+
+class ProfilingStage:
+    """
+    Profiling of original and cleaned data as separate stage (config "profiling")
+    mode: off, minimal or full
+    sample_frac: fraction of rows used for the reports (None for all rows)
+    parallel: render the reports in worker processes without blocking the cleaning
+    wait: with parallel, wait for the reports before the cleaning returns (otherwise see futures / wait())
+    """
+    def __init__(self, profiling_config:dict=None):
+        profiling_config = profiling_config or {}
+        self.mode = profiling_config.get("mode", "full")
+        if self.mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode {self.mode}, use one of {PROFILING_MODES}")
+        self.sample_frac = profiling_config.get("sample_frac")
+        self.parallel = profiling_config.get("parallel", False)
+        self.wait_for_reports = profiling_config.get("wait", False)
+        self.executor = None
+        self.futures = []
+
+    def sample(self, df:pd.DataFrame) -> pd.DataFrame:
+        if self.sample_frac and self.sample_frac < 1:
+            return df.sample(frac=self.sample_frac, random_state=0)
+        return df
+
+    def start(self, reports:dict):
+        """
+        Start creating the reports
+        :param reports: dict report path -> dataframe
+        :return: list of report paths already saved (empty if parallel)
+        """
+        if self.mode == "off":
+            return []
+
+        minimal = self.mode == "minimal"
+        if not self.parallel:
+            return [create_profile(self.sample(df), path, minimal) for path, df in reports.items()]
+
+        self.executor = ProcessPoolExecutor(max_workers=len(reports))
+        self.futures = [self.executor.submit(create_profile, self.sample(df), path, minimal)
+                        for path, df in reports.items()]
+        return []
+
+    def pending(self) -> bool:
+        """Reports are still rendered in worker processes"""
+        return self.executor is not None
+
+    def wait(self):
+        """Wait for reports rendered in worker processes, return list of saved report paths"""
+        if self.executor is None:
+            return []
+        report_paths = [future.result() for future in self.futures]
+        self.executor.shutdown()
+        self.executor = None
+        self.futures = []
+        return report_paths
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from row_hash_index import RowHashIndex
+
+# Config keys without influence on the cleaned result
+IGNORED_CONFIG_KEYS = ("cache", "profiling", "log_removed_indices")
+
+
+def hash_file(path:str, prefix_size:int=None, block_size:int=1 << 20):
+    """
+    Hash file content in one pass
+    :param prefix_size: Additionally return the hash of the first prefix_size bytes
+    :return: (content hash, prefix hash or None)
+    """
+    digest = hashlib.sha256()
+    prefix_hash = None
+    position = 0
+    with open(path, mode="rb") as file:
+        while True:
+            size = block_size
+            if prefix_size and position < prefix_size:
+                size = min(block_size, prefix_size - position)
+            block = file.read(size)
+            if not block:
+                break
+            digest.update(block)
+            position += len(block)
+            if position == prefix_size:
+                prefix_hash = digest.hexdigest()
+    return digest.hexdigest(), prefix_hash
+
+
+def merge_results(df_previous:pd.DataFrame, df_new:pd.DataFrame) -> pd.DataFrame:
+    """Append newly cleaned rows to a previous result, categorical columns stay categorical"""
+    if df_new.empty:
+        return df_previous
+    merged = pd.concat([df_previous, df_new], ignore_index=True)
+    for col in merged.columns:
+        if isinstance(df_previous[col].dtype, pd.CategoricalDtype) and not isinstance(merged[col].dtype, pd.CategoricalDtype):
+            merged[col] = merged[col].astype("category")
+    return merged
+
+
+class ResultCache:
+    """
+    Cache of cleaned results keyed by input content hash and config hash (config "cache")
+    key "content" hashes the input on every run, "stat" trusts unchanged size and mtime.
+    If a csv input only got new rows appended, just the tail is cleaned and merged into the cached result
+    before outlier handling (typed result), outliers are then handled on all rows like in a full run.
+    """
+    def __init__(self, cache_dir:str, cleaning_config:dict, key:str="content"):
+        self.cache_dir = Path(cache_dir)
+        (self.cache_dir / "results").mkdir(parents=True, exist_ok=True)
+        self.key = key
+        config = {k: v for k, v in cleaning_config.items() if k not in IGNORED_CONFIG_KEYS}
+        self.config_hash = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+    def path_key(self, input_path:str) -> str:
+        return hashlib.sha256(str(Path(input_path).resolve()).encode()).hexdigest()[:16]
+
+    def result_path(self, content_hash:str) -> Path:
+        return self.cache_dir / "results" / f"{content_hash[:16]}_{self.config_hash}.parquet"
+
+    def load_meta(self, input_path:str):
+        """Metadata of the last cached run for this input path (None if not available)"""
+        meta_path = self.cache_dir / f"{self.path_key(input_path)}.json"
+        if not meta_path.exists():
+            return None
+        with open(meta_path) as file:
+            return json.load(file)
+
+    def lookup(self, input_path:str) -> dict:
+        """
+        Check the cache for input_path
+        :return: dict with status "hit" (unchanged), "append" (only new rows appended) or "miss"
+        """
+        stat = os.stat(input_path)
+        meta = self.load_meta(input_path)
+        lookup = {"status": "miss", "size": stat.st_size, "mtime": stat.st_mtime_ns, "meta": meta}
+
+        if self.key == "stat" and meta and meta["size"] == stat.st_size and meta["mtime"] == stat.st_mtime_ns:
+            content_hash, prefix_hash = meta["content_hash"], None
+        else:
+            prefix_size = meta["size"] if meta and 0 < meta["size"] < stat.st_size else None
+            content_hash, prefix_hash = hash_file(input_path, prefix_size)
+        lookup["content_hash"] = content_hash
+        lookup["result_path"] = self.result_path(content_hash)
+
+        if lookup["result_path"].exists():
+            lookup["status"] = "hit"
+        elif (meta and prefix_hash == meta["content_hash"] and meta["config_hash"] == self.config_hash
+              and meta["ends_with_newline"] and meta.get("typed_path") and Path(meta["typed_path"]).exists()):
+            lookup["status"] = "append"
+        return lookup
+
+    def read_result(self, result_path:str):
+        """Return cached cleaned dataframe and number of input rows"""
+        with open(Path(result_path).with_suffix(".json")) as file:
+            rows_in = json.load(file)["rows_in"]
+        return pd.read_parquet(result_path), rows_in
+
+    def read_typed(self, meta:dict) -> pd.DataFrame:
+        """Cached result with corrected dtypes before outlier handling"""
+        return pd.read_parquet(meta["typed_path"])
+
+    def read_tail(self, input_path:str, meta:dict) -> pd.DataFrame:
+        """Read only the rows appended to a csv file since the cached run (as str like the cached run)"""
+        with open(input_path, mode="rb") as file:
+            file.seek(meta["size"])
+            return pd.read_csv(file, header=None, names=meta["columns"], dtype=str)
+
+    def load_fingerprints(self, meta:dict) -> np.ndarray:
+        """Row fingerprints of the cached result for duplicate removal in the tail"""
+        return RowHashIndex(meta["index_path"]).hashes
+
+    def store(self, input_path:str, lookup:dict, df:pd.DataFrame, df_clean:pd.DataFrame, df_typed:pd.DataFrame,
+              row_hash_index:RowHashIndex, rows_in:int):
+        """
+        Save cleaned result, row fingerprints and metadata for later runs
+        :param df_typed: Result before outlier handling, appended rows are merged into it
+        """
+        result_path = lookup["result_path"]
+        df_clean.to_parquet(result_path, index=False)
+        typed_path = result_path
+        if df_typed is not df_clean:
+            typed_path = result_path.with_suffix(".typed.parquet")
+            df_typed.to_parquet(typed_path, index=False)
+        with open(result_path.with_suffix(".json"), mode="w") as file:
+            json.dump({"rows_in": rows_in}, file)
+
+        path_key = self.path_key(input_path)
+        index_path = self.cache_dir / f"{path_key}.npy"
+        fingerprints = RowHashIndex(index_path)
+        fingerprints.add(np.union1d(row_hash_index.hashes, row_hash_index.new_hashes))
+        fingerprints.save()
+
+        with open(input_path, mode="rb") as file:
+            file.seek(max(lookup["size"] - 1, 0))
+            ends_with_newline = file.read(1) == b"\n"
+        meta = {
+            "input_path": str(input_path),
+            "size": lookup["size"],
+            "mtime": lookup["mtime"],
+            "content_hash": lookup["content_hash"],
+            "config_hash": self.config_hash,
+            "result_path": str(result_path),
+            "typed_path": str(typed_path),
+            "index_path": str(index_path),
+            "columns": df.columns.to_list(),
+            "ends_with_newline": ends_with_newline,
+        }
+        with open(self.cache_dir / f"{path_key}.json", mode="w") as file:
+            json.dump(meta, file, indent=2)
@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Rows per block when merging a memory mapped index into a file
+MERGE_BLOCK_SIZE = 1 << 20
+
+
+def merge_sorted(a:np.ndarray, b:np.ndarray) -> np.ndarray:
+    """Merge two sorted fingerprint arrays without common values in O(len(a) + len(b))"""
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) == 0:
+        return np.asarray(a)
+    return np.insert(a, np.searchsorted(a, b), b)
+
+
+def merge_to_file(base:np.ndarray, new:np.ndarray, path:str, block_size:int=MERGE_BLOCK_SIZE):
+    """
+    Write the merge of a (memory mapped) sorted array and a sorted in-memory array to a .npy file
+    The base array is processed block by block, so it is never loaded into RAM completely
+    """
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint64, shape=(len(base) + len(new),))
+    positions = np.searchsorted(base, new)
+    done_new = 0
+    for start in range(0, max(len(base), 1), block_size):
+        stop = min(start + block_size, len(base))
+        # New fingerprints sorted before base[stop] belong to this block (the rest to the last block)
+        end_new = np.searchsorted(positions, stop, side="left") if stop < len(base) else len(new)
+        block = np.insert(base[start:stop], positions[done_new:end_new] - start, new[done_new:end_new])
+        offset = start + done_new
+        out[offset:offset + len(block)] = block
+        done_new = end_new
+    out.flush()
+    del out
+
+
+class RowHashIndex:
+    """
+    Compact set of 64-bit row fingerprints to find duplicated rows across chunks and runs
+    Fingerprints are created with pandas' vectorized hashing and kept as sorted uint64 arrays (8 bytes per row).
+    New fingerprints are kept as sorted runs, merged only with runs of similar size (amortized O(n log n)).
+    Optionally the index is persisted to a .npy file, which can be memory mapped instead of loaded into RAM.
+    With a path, more than spill_rows new fingerprints are merged into a memory mapped spill file next to it.
+    Note: fingerprints depend on the column dtypes, so use the index always with the same read settings.
+    """
+    def __init__(self, path:str=None, mmap:bool=False, spill_rows:int=None):
+        self.path = path
+        self.mmap = mmap
+        self.spill_rows = spill_rows
+        # Fingerprints from previous runs and spilled fingerprints (read-only, memory mapped if requested)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        if path and Path(path).exists():
+            self.hashes = np.load(path, mmap_mode="r" if mmap else None)
+        self.spill_path = f"{path}.spill.npy" if path else None
+        # Fingerprints added in this run, sorted runs of decreasing size
+        self.runs = []
+
+    def __len__(self):
+        return len(self.hashes) + sum(len(run) for run in self.runs)
+
+    @property
+    def new_hashes(self) -> np.ndarray:
+        """Sorted fingerprints added in this run and not spilled yet"""
+        self.compact()
+        return self.runs[0] if self.runs else np.empty(0, dtype=np.uint64)
+
+    @staticmethod
+    def hash_rows(df:pd.DataFrame) -> np.ndarray:
+        """Return one 64-bit fingerprint per row"""
+        return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+    @staticmethod
+    def _isin_sorted(sorted_hashes:np.ndarray, hashes:np.ndarray) -> np.ndarray:
+        """Vectorized membership test against a sorted fingerprint array"""
+        if len(sorted_hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(sorted_hashes, hashes)
+        pos[pos == len(sorted_hashes)] = 0
+        return sorted_hashes[pos] == hashes
+
+    def contains(self, hashes:np.ndarray) -> np.ndarray:
+        """Boolean mask of fingerprints in the index"""
+        mask = self._isin_sorted(self.hashes, hashes)
+        for run in self.runs:
+            mask |= self._isin_sorted(run, hashes)
+        return mask
+
+    def duplicated(self, df:pd.DataFrame) -> np.ndarray:
+        """
+        Return boolean mask of rows already seen (in this frame, previous chunks or previous runs)
+        Rows not seen before are added to the index, so the first occurrence is kept like in drop_duplicates()
+        """
+        return self.duplicated_hashes(self.hash_rows(df))
+
+    def duplicated_hashes(self, hashes:np.ndarray) -> np.ndarray:
+        """Same as duplicated() for already computed row fingerprints"""
+        mask = pd.Series(hashes).duplicated().to_numpy()
+        mask |= self.contains(hashes)
+        self.add_run(np.sort(hashes[~mask]))
+        return mask
+
+    def add(self, hashes:np.ndarray):
+        """Add fingerprints to the index (fingerprints already in the index are ignored)"""
+        hashes = np.unique(hashes)
+        self.add_run(hashes[~self.contains(hashes)])
+
+    def add_run(self, run:np.ndarray):
+        """Add sorted fingerprints not in the index yet as new run, merge runs of similar size"""
+        if not len(run):
+            return
+        self.runs.append(run)
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            self.runs[-1] = merge_sorted(self.runs[-1], last)
+        if self.spill_path and self.spill_rows and len(self) - len(self.hashes) > self.spill_rows:
+            self.spill()
+
+    def compact(self):
+        """Merge all runs into one sorted array"""
+        while len(self.runs) > 1:
+            last = self.runs.pop()
+            self.runs[-1] = merge_sorted(self.runs[-1], last)
+
+    def spill(self):
+        """Merge the new fingerprints with the index into the spill file and memory map it"""
+        self.compact()
+        tmp_path = f"{self.spill_path}.tmp.npy"
+        merge_to_file(self.hashes, self.new_hashes, tmp_path)
+        self.hashes = None
+        os.replace(tmp_path, self.spill_path)
+        self.hashes = np.load(self.spill_path, mmap_mode="r")
+        self.runs = []
+
+    def save(self):
+        """Persist all fingerprints to path (written to a temporary file first and replaced)"""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp.npy"
+        merge_to_file(self.hashes, self.new_hashes, tmp_path)
+        # Release a memory mapped file before it gets replaced
+        self.hashes = None
+        os.replace(tmp_path, self.path)
+        if self.spill_path and Path(self.spill_path).exists():
+            os.remove(self.spill_path)
+        self.hashes = np.load(self.path, mmap_mode="r" if self.mmap else None)
+        self.runs = []
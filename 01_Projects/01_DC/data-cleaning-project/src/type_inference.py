@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
+
+INT_DTYPES = ["int8", "int16", "int32", "int64"]
+
+
+def narrowest_int(values:np.ndarray):
+    """Return the narrowest int dtype holding all values, None if even int64 is too small"""
+    if len(values) == 0:
+        return INT_DTYPES[0]
+    low, high = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def narrowest_float(values:np.ndarray):
+    """Return float32 if all values survive the round trip, otherwise float64"""
+    values = values.astype("float64")
+    with np.errstate(over="ignore"):
+        as_float32 = values.astype("float32").astype("float64")
+    if np.array_equal(as_float32, values, equal_nan=True):
+        return "float32"
+    return "float64"
+
+
+def to_numeric(series:pd.Series) -> pd.Series:
+    if is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def infer_dtype(series:pd.Series, date_format:str=None, category_ratio:float=0.5):
+    """
+    Infer target dtype of a column, each candidate type is parsed at most once
+    # int8/16/32/64 -> float32/64 -> datetime -> category -> str
+    :return: (dtype, parsed series for numeric and datetime dtypes otherwise None)
+    """
+    if is_bool_dtype(series) or is_datetime64_any_dtype(series):
+        return str(series.dtype), series
+
+    n_valid = series.notna().sum()
+    numeric = to_numeric(series)
+    if numeric.dtype.kind in "iuf" and numeric.notna().sum() == n_valid:
+        if numeric.dtype.kind in "iu":
+            dtype = narrowest_int(numeric.to_numpy())
+            if dtype:
+                return dtype, numeric
+        return narrowest_float(numeric.to_numpy()), numeric
+
+    if n_valid:
+        dates = pd.to_datetime(series, format=date_format, errors="coerce")
+        if dates.notna().sum() == n_valid:
+            return str(dates.dtype), dates
+
+    if series.nunique(dropna=False) <= category_ratio * len(series):
+        return "category", None
+    return "str", None
+
+
+def convert_verified(series:pd.Series, dtype:str, date_format:str=None) -> pd.Series:
+    """
+    Convert full column to a dtype inferred on a sample
+    Raise ValueError if values would get lost
+    """
+    if dtype in ("str", "category"):
+        return series.astype(dtype)
+    if dtype == str(series.dtype):
+        return series
+
+    n_valid = series.notna().sum()
+    if dtype.startswith("datetime"):
+        parsed = pd.to_datetime(series, format=date_format, errors="coerce")
+    else:
+        parsed = to_numeric(series)
+    if parsed.notna().sum() != n_valid:
+        raise ValueError(f"Not all values convertible to {dtype}")
+
+    if dtype in INT_DTYPES:
+        needed = narrowest_int(parsed.to_numpy()) if parsed.dtype.kind in "iu" else None
+        if needed is None or INT_DTYPES.index(needed) > INT_DTYPES.index(dtype):
+            raise ValueError(f"Values out of range for {dtype}")
+    elif dtype == "float32" and narrowest_float(parsed.to_numpy()) != "float32":
+        raise ValueError(f"Values not representable as {dtype}")
+    elif dtype.startswith("datetime"):
+        return parsed
+    return parsed.astype(dtype)
+
+
+def correct_dtypes(df:pd.DataFrame, date_format:str=None, sample_size:int=None, category_ratio:float=0.5):
+    """
+    Convert all columns to their narrowest safe dtype in one batch
+    With sample_size the dtype is inferred on a random sample and verified on the full column,
+    if the verification fails the dtype is inferred again on the full column.
+    :return: (converted dataframe, dict column -> dtype, saved memory in bytes)
+    """
+    memory_before = df.memory_usage(deep=True).sum()
+    columns = {}
+    dtypes = {}
+    for col in df.columns:
+        series = df[col]
+        converted = None
+        if sample_size and len(series) > sample_size:
+            dtype, _ = infer_dtype(series.sample(n=sample_size, random_state=0), date_format, category_ratio)
+            try:
+                converted = convert_verified(series, dtype, date_format)
+            except ValueError:
+                pass
+        if converted is None:
+            dtype, parsed = infer_dtype(series, date_format, category_ratio)
+            converted = (series if parsed is None else parsed).astype(dtype)
+        columns[col] = converted
+        dtypes[col] = dtype
+
+    df_converted = pd.DataFrame(columns, index=df.index)
+    memory_saved = memory_before - df_converted.memory_usage(deep=True).sum()
+    return df_converted, dtypes, memory_saved
+
+
+def dtype_name(dtype) -> str:
+    """Name of a column dtype as returned by infer_dtype"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if is_object_dtype(dtype) or is_string_dtype(dtype):
+        return "str"
+    return str(dtype)
+
+
+def convert_to_dtypes(df:pd.DataFrame, dtypes:dict, date_format:str=None):
+    """
+    Convert new rows to the dtypes of an earlier result they get appended to
+    Raise ValueError if values would get lost or need a wider dtype (see convert_verified)
+    :param dtypes: dict column -> dtype of the earlier result
+    :return: (converted dataframe, dict column -> dtype)
+    """
+    columns = {}
+    names = {}
+    for col in df.columns:
+        names[col] = dtype_name(dtypes[col])
+        columns[col] = convert_verified(df[col], names[col], date_format)
+    return pd.DataFrame(columns, index=df.index), names
+
+
+def verify_text_dtypes(df:pd.DataFrame, dtypes:dict, category_ratio:float=0.5):
+    """
+    Raise ValueError if the category ratio of merged text columns gives another dtype than before
+    :param dtypes: dict column -> dtype name from convert_to_dtypes
+    """
+    for col, dtype in dtypes.items():
+        if dtype in ("str", "category"):
+            is_category = df[col].nunique(dropna=False) <= category_ratio * len(df)
+            if is_category != (dtype == "category"):
+                raise ValueError(f"Column {col} would no longer be {dtype}")
+
+
+def convert_to_chunk_dtypes(df:pd.DataFrame, dtypes:dict, date_format:str=None):
+    """
+    Convert a chunk to the dtypes inferred on the first chunk (streaming mode)
+    Int columns may get a wider int dtype and float32 columns float64, this doesn't change their csv output.
+    Raise ValueError naming the column if its values don't fit otherwise.
+    :param dtypes: dict column -> dtype of the first cleaned chunk
+    :return: (converted dataframe, dict column -> dtype name)
+    """
+    columns = {}
+    names = {}
+    for col in df.columns:
+        name = dtype_name(dtypes[col])
+        if name in INT_DTYPES:
+            candidates = INT_DTYPES[INT_DTYPES.index(name):]
+        elif name == "float32":
+            candidates = ["float32", "float64"]
+        else:
+            candidates = [name]
+        errors = []
+        for candidate in candidates:
+            try:
+                columns[col] = convert_verified(df[col], candidate, date_format)
+                names[col] = candidate
+                break
+            except ValueError as error:
+                errors.append(str(error))
+        else:
+            raise ValueError(f"Column {col} doesn't fit the dtype {name} of the first chunk ({errors[0]}), "
+                             f"use a larger chunk_size or disable data_type_correction")
+    return pd.DataFrame(columns, index=df.index), names
@@ -3,193 +3,236 @@ from pathlib import Path
 os.chdir(Path(__file__).parent)
 
 import logging.config
-import requests
 from pprint import pprint
 from datetime import datetime, UTC, timezone
 from dotenv import load_dotenv
-import sqlite3
+import requests
+
+from owm_client import OWMClient, GROUP_SIZE
+from geocode_cache import GeocodeCache
+from weather_db import WeatherDB
+from weather_codes import WeatherCodeRegistry
 
 # Load of logging configuration file
-logging.config.fileConfig('./cfg/logging_config.ini')
+logging.config.fileConfig('./cfg/logging_config.ini', disable_existing_loggers=False)
+# Request urls contain the api key
+logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 # Create logger
 logger = logging.getLogger(__name__)
 
 load_dotenv(".env")
 API_KEY =  os.environ.get("API_KEY")
-
-def fetch_owm_weather_data(city):
-    # logging.info(f"Get coordinates for city {city} from OWM direct endpoint")
-    # Get coordinates for city name from OWM direct endpoint
-    url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}&limit=3&appid={API_KEY}"
-    response = requests.get(url)
-    data = response.json()
+# Base url can point to the local stub server (owm_stub_server.py)
+OWM_BASE_URL = os.environ.get("OWM_BASE_URL", "https://api.openweathermap.org")
+# Maximum number of concurrent requests to OWM
+OWM_MAX_WORKERS = int(os.environ.get("OWM_MAX_WORKERS", 8))
+# Fetch cities with known OWM city id with group requests, per city requests only for the others
+OWM_BULK = os.environ.get("OWM_BULK", "1") == "1"
+# Write observations to one table per month instead of weather_data (see WeatherDB)
+OWM_PARTITION_MONTHLY = os.environ.get("OWM_PARTITION_MONTHLY", "0") == "1"
+
+# Languages of weather descriptions, weather data is taken from the first language
+LANGS = ["en", "de"]
+
+def geocode_city(city, client:OWMClient):
+    """
+    Get coordinates for city name from OWM direct endpoint
+    :return: Location {"name", "lat", "lon"} or None on errors
+    """
+    try:
+        response = client.geocode(city)
+    except requests.RequestException as e:
+        # Raised by the client after all retries, the other cities of the cycle are still fetched
+        logging.warning(f"Request for coordinates of city {city} failed: {e}")
+        return None
 
     if response.status_code == 200:
         try:
-            lon = data[0]["lon"]
-            lat = data[0]["lat"]
-            logging.info(f"Sucessfully got coordinates for city {city}, latitude {lat}°, longitude {lon}°")
+            data = response.json()
+            return {"name": data[0]["name"], "lat": data[0]["lat"], "lon": data[0]["lon"]}
         except Exception as e:
             logging.info(f"Exception getting coordinates {e}")
-            return {}
-        else:
-            if lon and lat:
-                weather_data = {} # Collecting weather data
-                weather_codes = {} # Collecting weather description for multiple languages
-                weather_codes = weather_codes_from_db() # Fill with existing descriptions from db
-
-                weather_id = 9999
-                for l, lang in enumerate(["en", "de"]):
-                    if len(weather_data)==0 or (weather_id in weather_codes and (lang not in weather_codes[weather_id] or not weather_codes[weather_id][lang])):
-                        if (weather_id in weather_codes and (lang not in weather_codes[weather_id] or not weather_codes[weather_id][lang])):
-                            logging.info(f"Requesting weather data for missing weather description for {weather_id} in {lang}")
-                        # logging.info(f"Get weather data for city {city} from OWM with weather endpoint")
-                        # Get weather data from OWM with weather endpoint
-                        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric&lang={lang}"
-                        response = requests.get(url)
-                        data = response.json()
-
-                        if response.status_code == 200:
-                            tstp = datetime.fromtimestamp(int(data['dt']), tz=UTC).astimezone() # Convert unix timestamp to localized datetime timestamp
-                            name = data["name"]
-                            temp = data["main"]["temp"]
-                            weather_id   = data["weather"][0]["id"]
-                            descp_lang = data["weather"][0]["description"]
-
-                            # Save weather description for language
-                            if weather_id not in weather_codes:
-                                weather_codes[weather_id] = {lang: descp_lang}
-                                logging.info(f"New weather id {weather_id}: {weather_codes[weather_id]}")
-                            else:
-                                weather_codes[weather_id][lang] = descp_lang
-                                if lang not in weather_codes[weather_id]:
-                                    logging.info(f"New weather description in {lang} for {weather_id}: {weather_codes[weather_id]}")
-
-                            # Save weather data
-                            if len(weather_data)==0:
-                                weather_data = {
-                                    "city_query": city,
-                                    "city": name,
-                                    "date": tstp,
-                                    "temperature": temp,
-                                    "weather_id": weather_id
-                                }
-                            logging.info(f"Sucessfully got weather data for city {city} ({name})\n{weather_data}")
-
-                weather_data_to_db(weather_data)
-
-                weather_codes_to_db(weather_codes)
-
-
     else:
         logging.info(f"Error requesting coordinates with status code {response.status_code}")
+    return None
+
+def parse_weather(city, data:dict) -> dict:
+    """Weather data from OWM weather response for city query"""
+    tstp = datetime.fromtimestamp(int(data['dt']), tz=UTC).astimezone() # Convert unix timestamp to localized datetime timestamp
+    return {
+        "city_query": city,
+        "city": data["name"],
+        "date": tstp,
+        "temperature": data["main"]["temp"],
+        "weather_id": data["weather"][0]["id"]
+    }
+
+def fetch_owm_weather_data(city, client:OWMClient, geocode_cache:GeocodeCache, weather_codes:WeatherCodeRegistry):
+    """
+    Get coordinates and current weather for city from OWM
+    :param client: Shared OWM client (pooled session), may be used from multiple threads
+    :param geocode_cache: Coordinates are only requested from OWM for cities not in the cache
+    :param weather_codes: Shared weather code registry, updated with new descriptions
+    :return: Weather data, empty dict on errors (also on request errors after all retries)
+    """
+    location = geocode_cache.lookup(city, lambda: geocode_city(city, client))
+    if location is None:
         return {}
 
+    lon = location["lon"]
+    lat = location["lat"]
+    logging.info(f"Sucessfully got coordinates for city {city}, latitude {lat}°, longitude {lon}°")
 
+    # Get weather data from OWM with weather endpoint
+    try:
+        response = client.current_weather(lat, lon, LANGS[0])
+    except requests.RequestException as e:
+        logging.warning(f"Request for weather data of city {city} failed: {e}")
+        return {}
+    if response.status_code != 200:
+        logging.info(f"Error requesting weather data with status code {response.status_code}")
+        return {}
 
-def create_weather_db():
-    conn = sqlite3.connect('./db/weather.db')
-    c = conn.cursor()
-
-    sql = """CREATE TABLE IF NOT EXISTS weather_data
-             (
-                 ID integer primary key,
-                 city_query text,
-                 city text,
-                 date_unix integer,
-                 date_str text,
-                 temp real,
-                 weather_id integer
-             )"""
-    c.execute(sql)
-    conn.commit()
-
-    sql = """CREATE TABLE IF NOT EXISTS weather_codes
-             (
-                 ID integer primary key,
-                 weather_id integer,
-                 descp_en text,
-                 descp_de text
-             )"""
-    c.execute(sql)
-    conn.commit()
-
-    conn.close()
-
-def weather_data_to_db(weather_data):
-    conn = sqlite3.connect('./db/weather.db')
-    c = conn.cursor()
-
-    city_query = weather_data["city_query"]
-    city = weather_data["city"]
-    date = weather_data["date"]
-    date_unix = date.replace(microsecond=0).timestamp()
-    date_str = date.replace(microsecond=0).isoformat()
-    temperature = weather_data["temperature"]
+    data = response.json()
+    weather_data = parse_weather(city, data)
     weather_id = weather_data["weather_id"]
-
-    params = (city_query, city, date_unix, date_str, temperature, weather_id)
-
-    sql = """INSERT INTO weather_data (city_query, city, date_unix, date_str, temp, weather_id) \
-             VALUES (?, ?, ?, ?, ?, ?)"""
-    c.execute(sql, params)
-    conn.commit()
-
-    conn.close()
-
-def weather_codes_to_db(weather_codes):
-    conn = sqlite3.connect('./db/weather.db')
-    c = conn.cursor()
-
-    for weather_id in weather_codes:
-        sql = """SELECT * FROM weather_codes WHERE weather_id = ?"""
-        result = c.execute(sql, (weather_id,)).fetchall()
-
-        if len(result)==0:
-            params = (weather_id,)
-            sql = """INSERT INTO weather_codes (weather_id) VALUES (?)"""
-            c.execute(sql, params)
-            conn.commit()
-
-        for lang in weather_codes[weather_id]:
-            descp_col = f"descp_{lang}"
-            descp = weather_codes[weather_id][lang]
-            params = (descp, weather_id)
-            sql = f"""UPDATE weather_codes SET {descp_col} = ? WHERE weather_id = ?"""
-            c.execute(sql, params)
-            conn.commit()
-
-    conn.close()
-
-def weather_codes_from_db():
-    weather_codes = {}
-    conn = sqlite3.connect('./db/weather.db')
-    c = conn.cursor()
-
-    params = ()
-    sql = """SELECT * FROM weather_codes"""
-    cursor = c.execute(sql, params)
-    cols = [description[0] for description in cursor.description]
-    result = cursor.fetchall()
-    for vals in result:
-        weather_id = vals[cols.index("weather_id")]
-        weather_codes[weather_id] = {}
-
-        for col, val in zip(cols, vals):
-            if col.startswith("descp_"):
-                lang = col.replace("descp_", "")
-                weather_codes[weather_id][lang] = val
-
-    return weather_codes
-
-def get_weather_for_cities():
-    for city in ["Berlin", "Aachen", "Stuttgart"]:
-        fetch_owm_weather_data(city)
+    weather_codes.update(weather_id, LANGS[0], data["weather"][0]["description"])
+    # OWM city id allows group requests for this city in the next cycles
+    if not location.get("city_id"):
+        geocode_cache.set_city_id(city, data["id"])
+    logging.info(f"Sucessfully got weather data for city {city} ({data['name']})\n{weather_data}")
+
+    # Descriptions in other languages come from the bundled conditions and the db, only a weather id never
+    # seen before in a language is requested, once across all cities
+    for lang in LANGS[1:]:
+        if weather_codes.claim(weather_id, lang):
+            logging.info(f"Requesting weather data for missing weather description for {weather_id} in {lang}")
+            try:
+                response = client.current_weather(lat, lon, lang)
+                if response.status_code == 200:
+                    data = response.json()
+                    weather_codes.update(data["weather"][0]["id"], lang, data["weather"][0]["description"])
+                else:
+                    logging.info(f"Error requesting weather data with status code {response.status_code}")
+            except requests.RequestException as e:
+                # Weather data of the city is kept, the description is requested again in a later cycle
+                logging.warning(f"Request for weather description of {weather_id} in {lang} failed: {e}")
+            finally:
+                # Also on other errors, otherwise the description could never be claimed again
+                weather_codes.release(weather_id, lang)
+
+    return weather_data
+
+def fetch_owm_weather_group(cities:dict, client:OWMClient, weather_codes:WeatherCodeRegistry):
+    """
+    Get current weather for cities with known OWM city id, one group request per GROUP_SIZE cities
+    Missing descriptions in other languages are requested with one city per unknown weather id and language
+    :param cities: City query per OWM city id
+    :return: Weather data per city query, cities missing in the responses are not included
+    """
+    city_ids = list(cities)
+    chunks = [city_ids[i:i + GROUP_SIZE] for i in range(0, len(city_ids), GROUP_SIZE)]
+
+    def fetch_chunk(chunk):
+        weather_data = {}
+        try:
+            response = client.group_weather(chunk, LANGS[0])
+        except requests.RequestException as e:
+            # Cities of this chunk are missing in the cycle, the other chunks are still saved
+            logging.warning(f"Group request for city ids {chunk} failed: {e}")
+            return weather_data
+        if response.status_code != 200:
+            logging.info(f"Error requesting group weather data with status code {response.status_code}")
+            return weather_data
+
+        for data in response.json()["list"]:
+            weather_codes.update(data["weather"][0]["id"], LANGS[0], data["weather"][0]["description"])
+            weather_data[cities[data["id"]]] = parse_weather(cities[data["id"]], data)
+        return weather_data
+
+    results = {}
+    for weather_data in client.map(fetch_chunk, chunks):
+        results.update(weather_data)
+
+    city_ids = {city: city_id for city_id, city in cities.items()}
+    for lang in LANGS[1:]:
+        missing = {}
+        try:
+            for city, weather_data in results.items():
+                if weather_data["weather_id"] not in missing and weather_codes.claim(weather_data["weather_id"], lang):
+                    missing[weather_data["weather_id"]] = city_ids[city]
+            if missing:
+                logging.info(f"Requesting weather data for missing weather descriptions for {list(missing)} in {lang}")
+                missing_ids = list(missing.values())
+                for i in range(0, len(missing_ids), GROUP_SIZE):
+                    try:
+                        response = client.group_weather(missing_ids[i:i + GROUP_SIZE], lang)
+                    except requests.RequestException as e:
+                        logging.warning(f"Group request for weather descriptions in {lang} failed: {e}")
+                        continue
+                    if response.status_code == 200:
+                        for data in response.json()["list"]:
+                            weather_codes.update(data["weather"][0]["id"], lang, data["weather"][0]["description"])
+                    else:
+                        logging.info(f"Error requesting group weather data with status code {response.status_code}")
+        finally:
+            # All claimed ids, also on errors, otherwise they could never be claimed again
+            for weather_id in missing:
+                weather_codes.release(weather_id, lang)
+
+    return results
+
+def get_weather_for_cities(db:WeatherDB, weather_codes:WeatherCodeRegistry, cities=("Berlin", "Aachen", "Stuttgart"),
+                           bulk:bool=OWM_BULK, client:OWMClient=None, geocode_cache:GeocodeCache=None):
+    """
+    Fetch weather for cities concurrently over one pooled session, write the cycle to db in one transaction
+    :param bulk: Use group requests for cities with known OWM city id, per city requests for the others
+    :param client: OWM client kept by the caller across cycles, a new one is created and closed if None
+    :param geocode_cache: Geocode cache kept by the caller across cycles, a new one is created and closed if None
+    :return: Weather data of the cycle
+    """
+    own_client = client is None
+    own_geocode_cache = geocode_cache is None
+    if own_client:
+        client = OWMClient(API_KEY, OWM_BASE_URL, max_workers=OWM_MAX_WORKERS)
+    if own_geocode_cache:
+        geocode_cache = GeocodeCache(db.db_path)
+
+    try:
+        start_count = client.request_count
+        results = {}
+        remaining = list(cities)
+        if bulk:
+            locations = client.map(lambda city: geocode_cache.lookup(city, lambda: geocode_city(city, client)), cities)
+            grouped = {location["city_id"]: city for city, location in zip(cities, locations)
+                       if location and location.get("city_id")}
+            results = fetch_owm_weather_group(grouped, client, weather_codes)
+            # Cities without coordinates are skipped, they have just been requested
+            remaining = [city for city, location in zip(cities, locations) if location and city not in results]
+
+        results.update(zip(remaining, client.map(lambda city: fetch_owm_weather_data(city, client, geocode_cache, weather_codes), remaining)))
+        weather_data = [data for data in results.values() if data]
+        request_count = client.request_count - start_count
+        logging.info(f"Fetched weather for {len(weather_data)} of {len(cities)} cities with {request_count} requests "
+                     f"({request_count / max(len(weather_data), 1):0.2f} requests per city)")
+        logging.info(f"Geocode cache {geocode_cache.stats()}")
+    finally:
+        # Also on request errors (e.g. ConnectionError after all retries)
+        if own_client:
+            client.close()
+        if own_geocode_cache:
+            geocode_cache.close()
+
+    changes = weather_codes.changes()
+    db.save_cycle(weather_data, changes)
+    weather_codes.mark_saved(changes)
+    return weather_data
 
 def main():
-    create_weather_db()
-    get_weather_for_cities()
+    with WeatherDB('./db/weather.db', partition_monthly=OWM_PARTITION_MONTHLY) as db:
+        db.create_weather_db()
+        get_weather_for_cities(db, WeatherCodeRegistry(db))
 
 
 if __name__ == "__main__":
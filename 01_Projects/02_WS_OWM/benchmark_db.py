@@ -0,0 +1,71 @@
+"""
+Insert throughput of the weather db, per-row connections/commits (previous implementation) vs WeatherDB
+python benchmark_db.py --rows 5000
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, UTC
+from pathlib import Path
+
+from weather_db import WeatherDB
+
+
+def synthetic_cycle(rows:int):
+    date = datetime.now(UTC)
+    weather_data = [{"city_query": f"City {i}", "city": f"City {i}", "date": date,
+                     "temperature": 10 + i % 20, "weather_id": 800 + i % 5} for i in range(rows)]
+    weather_codes = {800 + i: {"en": f"code {i}", "de": f"Code {i}"} for i in range(5)}
+    return weather_data, weather_codes
+
+
+def legacy_save(db_path:str, weather_data:list, weather_codes:dict):
+    """Previous implementation: new connection and commit for every observation and description"""
+    for data in weather_data:
+        conn = sqlite3.connect(db_path)
+        conn.execute("""INSERT INTO weather_data (city_query, city, date_unix, date_str, temp, weather_id)
+                        VALUES (?, ?, ?, ?, ?, ?)""", WeatherDB.weather_data_params(data))
+        conn.commit()
+        conn.close()
+
+        conn = sqlite3.connect(db_path)
+        for weather_id in weather_codes:
+            if not conn.execute("SELECT * FROM weather_codes WHERE weather_id = ?", (weather_id,)).fetchall():
+                conn.execute("INSERT INTO weather_codes (weather_id) VALUES (?)", (weather_id,))
+                conn.commit()
+            for lang, descp in weather_codes[weather_id].items():
+                conn.execute(f"UPDATE weather_codes SET descp_{lang} = ? WHERE weather_id = ?", (descp, weather_id))
+                conn.commit()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weather db inserts")
+    parser.add_argument("--rows", type=int, default=2000, help="Observations per scrape cycle")
+    args = parser.parse_args()
+
+    weather_data, weather_codes = synthetic_cycle(args.rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = str(Path(tmp_dir) / "legacy.db")
+        with WeatherDB(legacy_path) as db:
+            db.create_weather_db()
+            db.conn.execute("PRAGMA journal_mode=DELETE")
+        start = time.perf_counter()
+        legacy_save(legacy_path, weather_data, weather_codes)
+        legacy_time = time.perf_counter() - start
+
+        with WeatherDB(str(Path(tmp_dir) / "batched.db")) as db:
+            db.create_weather_db()
+            start = time.perf_counter()
+            db.save_cycle(weather_data, weather_codes)
+            batched_time = time.perf_counter() - start
+
+    print(f"Rows: {args.rows}")
+    print(f"Per-row connections: {legacy_time:0.3f} s ({args.rows / legacy_time:0.0f} rows/s)")
+    print(f"WeatherDB batched:   {batched_time:0.3f} s ({args.rows / batched_time:0.0f} rows/s)")
+    print(f"Speedup: {legacy_time / batched_time:0.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+HTTP requests per refreshed city, per city requests vs group requests, against the local stub server
+python benchmark_fetch.py --cities 1000 --cycles 2
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from owm_stub_server import start_stub_server
+
+server, OWM_STUB_URL = start_stub_server()
+os.environ["OWM_BASE_URL"] = OWM_STUB_URL
+
+import app
+from weather_db import WeatherDB
+from weather_codes import WeatherCodeRegistry
+
+
+def run(cities:list, cycles:int, bulk:bool, db_path:str) -> list:
+    stats = []
+    with WeatherDB(db_path) as db:
+        db.create_weather_db()
+        weather_codes = WeatherCodeRegistry(db)
+        for cycle in range(cycles):
+            start_count = server.request_count
+            start = time.perf_counter()
+            app.get_weather_for_cities(db, weather_codes, cities, bulk=bulk)
+            stats.append((server.request_count - start_count, time.perf_counter() - start))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OWM requests per city")
+    parser.add_argument("--cities", type=int, default=500, help="Number of synthetic cities")
+    parser.add_argument("--cycles", type=int, default=2, help="Scrape cycles, the first one fills the geocode cache")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    cities = [f"Stubcity {i}" for i in range(args.cities)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for bulk in (False, True):
+            stats = run(cities, args.cycles, bulk, str(Path(tmp_dir) / f"bulk_{bulk}.db"))
+            for cycle, (requests, elapsed) in enumerate(stats):
+                print(f"{'group' if bulk else 'per city':>8} cycle {cycle}: {requests:6d} requests, "
+                      f"{requests / args.cities:0.3f} requests per city, {elapsed:0.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+History query timings on synthetic observations, without and with indexes, optionally with monthly partitions
+python benchmark_queries.py --rows 10000000 --cities 1000 [--partition-monthly]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from weather_db import WeatherDB
+from weather_queries import WeatherQueries
+
+
+def fill(db:WeatherDB, rows:int, cities:int, partition_monthly:bool, chunk_size:int=100_000):
+    """Hourly observations for all cities, oldest first, ending now"""
+    hours = -(-rows // cities)
+    start = int(time.time()) // 3600 * 3600 - hours * 3600
+    chunk = []
+    table = None
+    with db.conn:
+        for i in range(rows):
+            hour, city = divmod(i, cities)
+            date_unix = start + hour * 3600
+            row_table = WeatherDB.partition_table(date_unix) if partition_monthly else "weather_data"
+            if row_table != table or len(chunk) >= chunk_size:
+                flush(db, table, chunk)
+                chunk = []
+                table = row_table
+            chunk.append((f"City {city}", f"City {city}", date_unix, "", (city % 40) - 10 + (hour % 24) / 2, 800 + city % 5))
+        flush(db, table, chunk)
+
+
+def flush(db:WeatherDB, table:str, chunk:list):
+    if not chunk:
+        return
+    db.conn.execute(f"""CREATE TABLE IF NOT EXISTS {table}
+                        (ID integer primary key, city_query text, city text, date_unix integer,
+                         date_str text, temp real, weather_id integer)""")
+    db.conn.executemany(f"""INSERT INTO {table} (city_query, city, date_unix, date_str, temp, weather_id)
+                            VALUES (?, ?, ?, ?, ?, ?)""", chunk)
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, len(result)
+
+
+def latest_per_city_scan(queries:WeatherQueries) -> list:
+    """Latest observation per city by grouping all rows, the skip scan of latest_per_city needs the index"""
+    return [row for table in queries.tables()
+            for row in queries.query(f"SELECT city_query, MAX(date_unix) AS date_unix, temp FROM {table} GROUP BY city_query")]
+
+
+def run_queries(queries:WeatherQueries, end:float, indexed:bool) -> dict:
+    week = end - 7 * 24 * 3600
+    return {
+        "latest_per_city": timed(queries.latest_per_city) if indexed else timed(latest_per_city_scan, queries),
+        "range_for_city (7 days)": timed(queries.range_for_city, "City 42", week, end),
+        "daily_stats city (7 days)": timed(queries.daily_stats, "City 42", week, end),
+        "daily_stats all cities (7 days)": timed(queries.daily_stats, None, week, end),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weather history queries")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cities", type=int, default=1000)
+    parser.add_argument("--partition-monthly", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with WeatherDB(str(Path(tmp_dir) / "weather.db"), partition_monthly=args.partition_monthly) as db:
+            start = time.perf_counter()
+            fill(db, args.rows, args.cities, args.partition_monthly)
+            print(f"Inserted {args.rows} rows for {args.cities} cities in {time.perf_counter() - start:0.1f} s")
+            queries = WeatherQueries(db)
+            end = time.time()
+
+            without_index = run_queries(queries, end, indexed=False)
+            start = time.perf_counter()
+            db.create_weather_db()
+            for table in db.weather_data_tables():
+                db.create_weather_data_table(table)
+            db.conn.execute("ANALYZE")
+            print(f"Created indexes in {time.perf_counter() - start:0.1f} s, tables: {len(db.weather_data_tables())}")
+            with_index = run_queries(queries, end, indexed=True)
+
+    print(f"{'Query':<34}{'No index':>12}{'Indexed':>12}{'Rows':>10}")
+    for name, (elapsed, _) in without_index.items():
+        print(f"{name:<34}{elapsed * 1000:>10.1f}ms{with_index[name][0] * 1000:>10.1f}ms{with_index[name][1]:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Client for the OpenWeatherMap API
+One pooled session (keep-alive connections), concurrent requests and retry with backoff on 429/5xx
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OWM_BASE_URL = "https://api.openweathermap.org"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Maximum number of city ids per request to the group endpoint
+GROUP_SIZE = 20
+
+
+class TokenBucket:
+    def __init__(self, calls_per_minute:float, capacity:float=None):
+        """
+        Rate limiter, tokens refill continuously at calls_per_minute
+        :param capacity: Maximum burst size, defaults to calls_per_minute / 6 (10 seconds of budget)
+        """
+        self.rate = calls_per_minute / 60
+        self.capacity = capacity if capacity is not None else max(calls_per_minute / 6, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens:float=1):
+        """Block until tokens are available and take them"""
+        while True:
+            with self.lock:
+                self.refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OWMClient:
+    def __init__(self, api_key:str, base_url:str=OWM_BASE_URL, max_workers:int=8, retries:int=3,
+                 backoff:float=0.5, timeout:float=10, rate_limiter=None):
+        """
+        :param max_workers: Maximum number of concurrent requests (threads and pooled connections)
+        :param retries: Retries on connection errors and status codes 429/5xx
+        :param backoff: Base delay in seconds, doubled on every retry (Retry-After header is preferred)
+        :param rate_limiter: Optional TokenBucket, one token is taken before every request (including retries)
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Number of HTTP requests sent (including retries)
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def redact(self, text:str) -> str:
+        """Remove the api key from messages (request errors contain the full url)"""
+        return text.replace(self.api_key, "***") if self.api_key else text
+
+    def retry_delay(self, attempt:int, response:requests.Response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * 2 ** attempt
+
+    def get(self, path:str, params:dict) -> requests.Response:
+        """GET request with api key, retried on connection errors and status codes 429/5xx"""
+        url = f"{self.base_url}{path}"
+        params = {**params, "appid": self.api_key}
+        for attempt in range(self.retries + 1):
+            response = None
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                with self.lock:
+                    self.request_count += 1
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logger.info(f"Request {path} failed ({self.redact(str(e))})")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    return response
+                logger.info(f"Request {path} failed with status code {response.status_code}")
+            delay = self.retry_delay(attempt, response)
+            logger.info(f"Retry {attempt + 1}/{self.retries} in {delay:0.1f} s")
+            time.sleep(delay)
+
+    def geocode(self, city:str, limit:int=3) -> requests.Response:
+        """Coordinates for a city name (OWM direct geocoding endpoint)"""
+        return self.get("/geo/1.0/direct", {"q": city, "limit": limit})
+
+    def current_weather(self, lat:float, lon:float, lang:str="en", units:str="metric") -> requests.Response:
+        """Current weather for coordinates (OWM weather endpoint)"""
+        return self.get("/data/2.5/weather", {"lat": lat, "lon": lon, "units": units, "lang": lang})
+
+    def group_weather(self, city_ids:list, lang:str="en", units:str="metric") -> requests.Response:
+        """Current weather for up to GROUP_SIZE OWM city ids in one request (OWM group endpoint)"""
+        return self.get("/data/2.5/group", {"id": ",".join(str(city_id) for city_id in city_ids),
+                                            "units": units, "lang": lang})
+
+    def map(self, func, items) -> list:
+        """Call func for all items concurrently (at most max_workers at a time), results in order of items"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
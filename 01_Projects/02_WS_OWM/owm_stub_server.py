@@ -0,0 +1,175 @@
+"""
+Local stub of the OpenWeatherMap endpoints used by the scraper, for offline runs and tests
+python owm_stub_server.py --port 8081 --fail-rate 0.2 --fail-status 503
+OWM_BASE_URL=http://127.0.0.1:8081 python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# City query -> (name, lat, lon, OWM city id)
+STUB_CITIES = {
+    "berlin": ("Berlin", 52.5170365, 13.3888599, 2950159),
+    "aachen": ("Aachen", 50.7753455, 6.0838868, 3247449),
+    "stuttgart": ("Stuttgart", 48.7784485, 9.1800132, 2825297),
+    "hamburg": ("Hamburg", 53.550341, 10.000654, 2911298),
+    "münchen": ("München", 48.1371079, 11.5753822, 2867714),
+}
+# Synthetic cities "Stubcity <n>" for load tests with many cities, OWM city id = STUB_ID_OFFSET + n
+STUB_ID_OFFSET = 10_000_000
+
+
+def stub_city(city_id:int):
+    """(name, lat, lon) for a stub city id or None"""
+    for name, lat, lon, known_id in STUB_CITIES.values():
+        if known_id == city_id:
+            return name, lat, lon
+    if city_id >= STUB_ID_OFFSET:
+        n = city_id - STUB_ID_OFFSET
+        return f"Stubcity {n}", 45 + (n % 1000) / 100, 5 + (n // 1000 % 1000) / 100
+    return None
+
+
+def stub_city_id(query:str):
+    """OWM city id for a city query or None"""
+    query = query.strip().lower()
+    if query in STUB_CITIES:
+        return STUB_CITIES[query][3]
+    if query.startswith("stubcity ") and query[9:].isdigit():
+        return STUB_ID_OFFSET + int(query[9:])
+    return None
+
+# Weather id -> description per language
+STUB_WEATHER = {
+    800: {"en": "clear sky", "de": "Klarer Himmel"},
+    801: {"en": "few clouds", "de": "Ein paar Wolken"},
+    500: {"en": "light rain", "de": "Leichter Regen"},
+    804: {"en": "overcast clouds", "de": "Bedeckt"},
+    211: {"en": "thunderstorm", "de": "Gewitter"},
+}
+
+
+class OWMStubHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections like the real API
+    protocol_version = "HTTP/1.1"
+
+    # Set on the server: fail_rate (share of failed responses), fail_status (429 or 5xx), retry_after
+    # (Retry-After header of failed responses), delay (seconds per request), coords (geocoded (lat, lon) -> city id),
+    # request_count, in_flight and max_in_flight (concurrent requests)
+    def send_json(self, status:int, data, headers:dict=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def weather(self, name:str, lat:float, lon:float, city_id:int, lang:str) -> dict:
+        # Deterministic weather per city
+        weather_id = list(STUB_WEATHER)[city_id % len(STUB_WEATHER)]
+        return {
+            "id": city_id,
+            "name": name,
+            "coord": {"lat": lat, "lon": lon},
+            "dt": int(time.time()),
+            "main": {"temp": round(lat / 10, 2)},
+            "weather": [{"id": weather_id, "description": STUB_WEATHER[weather_id].get(lang, STUB_WEATHER[weather_id]["en"])}]
+        }
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            self.handle_get()
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def handle_get(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if random.random() < self.server.fail_rate:
+            headers = {"Retry-After": self.server.retry_after} if self.server.retry_after is not None else {}
+            return self.send_json(self.server.fail_status, {"cod": self.server.fail_status, "message": "Stub failure"},
+                                  headers)
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        lang = query.get("lang", "en")
+        if url.path == "/geo/1.0/direct":
+            city_id = stub_city_id(query.get("q", ""))
+            if city_id is None:
+                return self.send_json(200, [])
+            name, lat, lon = stub_city(city_id)
+            self.server.coords[(lat, lon)] = city_id
+            return self.send_json(200, [{"name": name, "lat": lat, "lon": lon, "country": "DE"}])
+
+        if url.path == "/data/2.5/weather":
+            lat, lon = float(query["lat"]), float(query["lon"])
+            city_id = self.server.coords.get((lat, lon))
+            if city_id is None:
+                return self.send_json(200, self.weather("Somewhere", lat, lon, 1, lang))
+            return self.send_json(200, self.weather(*stub_city(city_id), city_id, lang))
+
+        if url.path == "/data/2.5/group":
+            city_ids = [int(city_id) for city_id in query.get("id", "").split(",") if city_id]
+            if len(city_ids) > 20:
+                return self.send_json(400, {"cod": 400, "message": "Too many city ids"})
+            weather = [self.weather(*stub_city(city_id), city_id, lang) for city_id in city_ids if stub_city(city_id)]
+            return self.send_json(200, {"cnt": len(weather), "list": weather})
+
+        return self.send_json(404, {"cod": 404, "message": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_stub_server(port:int=0, fail_rate:float=0.0, delay:float=0.0, fail_status:int=429,
+                       retry_after:str="0") -> ThreadingHTTPServer:
+    """
+    :param fail_rate: Share of requests answered with fail_status
+    :param retry_after: Retry-After header of failed responses (None for no header)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), OWMStubHandler)
+    server.fail_rate = fail_rate
+    server.fail_status = fail_status
+    server.retry_after = retry_after
+    server.delay = delay
+    server.request_count = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.lock = threading.Lock()
+    server.coords = {}
+    return server
+
+
+def start_stub_server(port:int=0, fail_rate:float=0.0, delay:float=0.0, fail_status:int=429, retry_after:str="0"):
+    """Start stub server in a background thread, return (server, base url)"""
+    server = create_stub_server(port, fail_rate, delay, fail_status, retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenWeatherMap stub server")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with fail status")
+    parser.add_argument("--fail-status", type=int, default=429, help="Status code of failed requests (429 or 5xx)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Delay per request in seconds")
+    args = parser.parse_args()
+
+    server = create_stub_server(args.port, args.fail_rate, args.delay, args.fail_status)
+    print(f"OWM stub server on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
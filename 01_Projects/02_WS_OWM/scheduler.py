@@ -0,0 +1,127 @@
+"""
+Long-running scraper, refreshes every city on its own interval within a calls per minute budget
+python scheduler.py --cities cfg/cities.txt --interval 600 --calls-per-minute 60
+python scheduler.py --from-db --partition-monthly
+
+City file: one city per line, optionally with its own interval in seconds ("Berlin, 300"), # starts a comment
+"""
+import argparse
+import heapq
+import logging
+import signal
+import threading
+import time
+
+from app import API_KEY, OWM_BASE_URL, OWM_MAX_WORKERS, OWM_PARTITION_MONTHLY, get_weather_for_cities
+from geocode_cache import GeocodeCache
+from owm_client import OWMClient, TokenBucket
+from weather_codes import WeatherCodeRegistry
+from weather_db import WeatherDB
+
+logger = logging.getLogger(__name__)
+
+
+def read_cities(path:str, interval:float) -> dict:
+    """Refresh interval in seconds per city from city file"""
+    cities = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            city, _, city_interval = line.partition(",")
+            cities[city.strip()] = float(city_interval) if city_interval.strip() else interval
+    return cities
+
+
+class WeatherScheduler:
+    def __init__(self, db:WeatherDB, cities:dict, calls_per_minute:float=60, max_batch:int=200):
+        """
+        :param cities: Refresh interval in seconds per city
+        :param calls_per_minute: Budget of OWM requests, spread with a token bucket
+        :param max_batch: Maximum number of due cities refreshed in one cycle
+        """
+        self.db = db
+        self.cities = cities
+        self.max_batch = max_batch
+        self.weather_codes = WeatherCodeRegistry(db)
+        self.geocode_cache = GeocodeCache(db.db_path)
+        self.client = OWMClient(API_KEY, OWM_BASE_URL, max_workers=OWM_MAX_WORKERS,
+                                rate_limiter=TokenBucket(calls_per_minute))
+        self.stop_event = threading.Event()
+
+        # Cities whose last observation is still fresh are due when it gets stale
+        last_observations = db.last_observations()
+        now = time.time()
+        self.queue = [(last_observations.get(city, 0) + interval, city) for city, interval in cities.items()]
+        heapq.heapify(self.queue)
+        fresh = sum(1 for due, _ in self.queue if due > now)
+        logger.info(f"Scheduling {len(cities)} cities, {fresh} with fresh observations")
+
+    def due_cities(self, now:float) -> list:
+        cities = []
+        while self.queue and self.queue[0][0] <= now and len(cities) < self.max_batch:
+            cities.append(heapq.heappop(self.queue)[1])
+        return cities
+
+    def run_cycle(self, cities:list):
+        try:
+            get_weather_for_cities(self.db, self.weather_codes, cities, client=self.client,
+                                   geocode_cache=self.geocode_cache)
+        except Exception as e:
+            logger.exception(f"Exception refreshing {len(cities)} cities {e}")
+        # Next refresh relative to the end of the cycle, failed cities are retried after their interval as well
+        now = time.time()
+        for city in cities:
+            heapq.heappush(self.queue, (now + self.cities[city], city))
+
+    def run(self):
+        logger.info("Scheduler started")
+        while not self.stop_event.is_set():
+            cities = self.due_cities(time.time())
+            if cities:
+                logger.info(f"Refreshing {len(cities)} cities")
+                self.run_cycle(cities)
+                continue
+            wait = self.queue[0][0] - time.time() if self.queue else 60
+            self.stop_event.wait(max(wait, 0.1))
+        logger.info("Scheduler stopped")
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def close(self):
+        self.client.close()
+        self.geocode_cache.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduled OWM weather scraper")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--cities", default="./cfg/cities.txt", help="City file")
+    source.add_argument("--from-db", action="store_true", help="Refresh all cities already in the weather db")
+    parser.add_argument("--interval", type=float, default=600, help="Default refresh interval per city in seconds")
+    parser.add_argument("--calls-per-minute", type=float, default=60, help="Budget of OWM requests per minute")
+    parser.add_argument("--max-batch", type=int, default=200, help="Maximum number of cities per cycle")
+    parser.add_argument("--partition-monthly", action="store_true", default=OWM_PARTITION_MONTHLY,
+                        help="Write observations to one table per month (default: env OWM_PARTITION_MONTHLY=1)")
+    args = parser.parse_args()
+
+    with WeatherDB('./db/weather.db', partition_monthly=args.partition_monthly) as db:
+        db.create_weather_db()
+        if args.from_db:
+            cities = {city: args.interval for city in db.last_observations()}
+        else:
+            cities = read_cities(args.cities, args.interval)
+
+        scheduler = WeatherScheduler(db, cities, args.calls_per_minute, args.max_batch)
+        signal.signal(signal.SIGINT, scheduler.stop)
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        try:
+            scheduler.run()
+        finally:
+            scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tests of the OWM client against the local stub server
+python -m pytest test_owm_client.py
+"""
+import logging
+import random
+import time
+
+import pytest
+import requests
+
+from owm_client import OWMClient
+from owm_stub_server import start_stub_server
+
+
+@pytest.fixture
+def stub():
+    """Start a stub server per test, return (server, base url)"""
+    random.seed(0)
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_on_429_until_success(stub):
+    server, url = stub
+    server.fail_rate = 0.5
+    with OWMClient("key", url, retries=10, backoff=0) as client:
+        responses = [client.geocode("Berlin") for _ in range(20)]
+    assert all(response.status_code == 200 for response in responses)
+    # Failed requests were retried and count as requests
+    assert client.request_count == server.request_count > 20
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_exhausted_return_last_response(stub, status):
+    server, url = stub
+    server.fail_rate = 1.0
+    server.fail_status = status
+    with OWMClient("key", url, retries=2, backoff=0) as client:
+        response = client.geocode("Berlin")
+    assert response.status_code == status
+    assert server.request_count == 3
+
+
+def test_no_retry_on_client_errors(stub):
+    server, url = stub
+    server.fail_rate = 1.0
+    server.fail_status = 401
+    with OWMClient("key", url, retries=3, backoff=0) as client:
+        response = client.geocode("Berlin")
+    assert response.status_code == 401
+    assert server.request_count == 1
+
+
+def test_retry_after_header_is_preferred(stub):
+    server, url = stub
+    server.fail_rate = 1.0
+    server.retry_after = "1"
+    with OWMClient("key", url, retries=1, backoff=10) as client:
+        start = time.perf_counter()
+        client.geocode("Berlin")
+        elapsed = time.perf_counter() - start
+    # One retry after 1 s (Retry-After) instead of 10 s (backoff)
+    assert 1 <= elapsed < 5
+    assert server.request_count == 2
+
+
+def test_exponential_backoff_without_retry_after(stub):
+    server, url = stub
+    server.fail_rate = 1.0
+    server.retry_after = None
+    with OWMClient("key", url, retries=2, backoff=0.2) as client:
+        start = time.perf_counter()
+        client.geocode("Berlin")
+        elapsed = time.perf_counter() - start
+    # 0.2 s + 0.4 s
+    assert 0.6 <= elapsed < 3
+
+
+def test_retry_delay():
+    client = OWMClient("key", backoff=0.5)
+    response = requests.Response()
+    assert client.retry_delay(0) == 0.5
+    assert client.retry_delay(2) == 2.0
+    response.headers["Retry-After"] = "3"
+    assert client.retry_delay(0, response) == 3.0
+    # HTTP dates are not parsed, backoff is used
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert client.retry_delay(1, response) == 1.0
+
+
+def test_concurrency_limit(stub):
+    server, url = stub
+    server.delay = 0.05
+    with OWMClient("key", url, max_workers=4) as client:
+        responses = client.map(lambda i: client.geocode(f"Stubcity {i}"), range(40))
+    assert [response.json()[0]["name"] for response in responses] == [f"Stubcity {i}" for i in range(40)]
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_connection_errors_retried_and_raised(caplog):
+    # Port of a closed stub server
+    server, url = start_stub_server()
+    server.shutdown()
+    server.server_close()
+    with OWMClient("secret-key", url, retries=2, backoff=0) as client:
+        with caplog.at_level(logging.INFO, logger="owm_client"):
+            with pytest.raises(requests.ConnectionError):
+                client.geocode("Berlin")
+    assert client.request_count == 3
+    # Error messages contain the request url, the api key is not logged
+    assert "Request /geo/1.0/direct failed" in caplog.text
+    assert "secret-key" not in caplog.text
@@ -0,0 +1,87 @@
+"""
+In-process registry of weather descriptions per weather id and language
+Loaded once from the bundled conditions file and the db, only new or changed descriptions are written back
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+
+from weather_db import WeatherDB
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherCodeRegistry:
+    def __init__(self, db:WeatherDB, conditions_path:str='./cfg/weather_conditions.json'):
+        """
+        :param conditions_path: Bundled OWM condition codes {lang: {weather_id: descp}}, db descriptions take precedence
+        """
+        self.db = db
+        self.lock = threading.Lock()
+        self.codes = db.weather_codes_from_db()
+        self.changed = set()
+        # Descriptions requested from OWM and not yet received, requested only once across threads
+        self.requested = set()
+
+        bundled = 0
+        if conditions_path and Path(conditions_path).exists():
+            with open(conditions_path, encoding="utf-8") as f:
+                conditions = json.load(f)
+            for lang, descps in conditions.items():
+                for weather_id, descp in descps.items():
+                    descps_db = self.codes.setdefault(int(weather_id), {})
+                    if not descps_db.get(lang):
+                        descps_db[lang] = descp
+                        self.changed.add(int(weather_id))
+                        bundled += 1
+        logger.info(f"Loaded {len(self.codes)} weather codes, {bundled} descriptions from bundled conditions")
+
+    def get(self, weather_id:int, lang:str) -> str:
+        with self.lock:
+            return self.codes.get(weather_id, {}).get(lang)
+
+    def missing(self, weather_id:int, lang:str) -> bool:
+        """True if there is no description for weather id in lang"""
+        return not self.get(weather_id, lang)
+
+    def claim(self, weather_id:int, lang:str) -> bool:
+        """
+        True if the description for weather id in lang is missing and not requested by another thread yet,
+        the caller is expected to request it and call release afterwards
+        """
+        with self.lock:
+            if self.codes.get(weather_id, {}).get(lang) or (weather_id, lang) in self.requested:
+                return False
+            self.requested.add((weather_id, lang))
+            return True
+
+    def release(self, weather_id:int, lang:str):
+        """End of a claimed request, a description still missing (failed request) may be claimed again"""
+        with self.lock:
+            self.requested.discard((weather_id, lang))
+
+    def update(self, weather_id:int, lang:str, descp:str):
+        """Set description, marks the weather id for writing only if the description is new or changed"""
+        with self.lock:
+            descps = self.codes.setdefault(weather_id, {})
+            if descps.get(lang) == descp:
+                return
+            if not descps:
+                logger.info(f"New weather id {weather_id}: {lang} {descp}")
+            else:
+                logger.info(f"New weather description in {lang} for {weather_id}: {descp}")
+            descps[lang] = descp
+            self.changed.add(weather_id)
+
+    def changes(self) -> dict:
+        """New or changed weather codes {weather_id: {lang: descp}} since the last flush"""
+        with self.lock:
+            return {weather_id: dict(self.codes[weather_id]) for weather_id in self.changed}
+
+    def mark_saved(self, weather_codes:dict):
+        """Forget changes after weather_codes (from changes()) have been written to db"""
+        with self.lock:
+            for weather_id, descps in weather_codes.items():
+                if self.codes.get(weather_id) == descps:
+                    self.changed.discard(weather_id)
@@ -0,0 +1,143 @@
+"""
+Storage layer for the weather scraper
+One shared SQLite connection in WAL mode, a scrape cycle is written in one transaction
+"""
+import logging
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, UTC
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions of weather_data are named weather_data_YYYYMM
+PARTITION_PATTERN = re.compile(r"weather_data_\d{6}")
+
+
+class WeatherDB:
+    def __init__(self, db_path:str='./db/weather.db', partition_monthly:bool=False):
+        """
+        :param partition_monthly: Write observations to one table per month (UTC) instead of weather_data
+                                  (app and scheduler: env OWM_PARTITION_MONTHLY=1, scheduler --partition-monthly)
+        """
+        self.db_path = db_path
+        self.partition_monthly = partition_monthly
+        # Connection is shared between threads, access is serialized with the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Durable with WAL on commit of each checkpoint, a lot faster than FULL
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        self.tables = set(self.weather_data_tables())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def create_weather_data_table(self, table:str):
+        """
+        Observation table with indexes for the history queries (weather_data or a monthly partition)
+        Note: ID is unique only within one table, partitions number their rows independently
+        """
+        self.conn.execute(f"""CREATE TABLE IF NOT EXISTS {table}
+                              (
+                                  ID integer primary key,
+                                  city_query text,
+                                  city text,
+                                  date_unix integer,
+                                  date_str text,
+                                  temp real,
+                                  weather_id integer
+                              )""")
+        self.conn.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_city_date ON {table} (city, date_unix)""")
+        self.conn.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_city_query_date ON {table} (city_query, date_unix)""")
+        self.conn.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table} (date_unix)""")
+        self.conn.execute(f"""CREATE INDEX IF NOT EXISTS idx_{table}_weather_id ON {table} (weather_id)""")
+        self.tables.add(table)
+
+    def weather_data_tables(self) -> list:
+        """weather_data and all monthly partitions, oldest partition first"""
+        rows = self.conn.execute("""SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'weather_data%'""").fetchall()
+        partitions = sorted(name for name, in rows if PARTITION_PATTERN.fullmatch(name))
+        return (["weather_data"] if ("weather_data",) in rows else []) + partitions
+
+    @staticmethod
+    def partition_table(date_unix:float) -> str:
+        return f"weather_data_{datetime.fromtimestamp(date_unix, tz=UTC):%Y%m}"
+
+    def create_weather_db(self):
+        with self.lock, self.conn:
+            self.create_weather_data_table("weather_data")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS weather_codes
+                                 (
+                                     ID integer primary key,
+                                     weather_id integer,
+                                     descp_en text,
+                                     descp_de text
+                                 )""")
+            # Drop duplicate weather ids of older dbs (keep the latest row) before adding the unique index
+            self.conn.execute("""DELETE FROM weather_codes
+                                 WHERE ID NOT IN (SELECT MAX(ID) FROM weather_codes GROUP BY weather_id)""")
+            self.conn.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_codes_weather_id
+                                 ON weather_codes (weather_id)""")
+
+    @staticmethod
+    def weather_data_params(weather_data:dict) -> tuple:
+        date = weather_data["date"].replace(microsecond=0)
+        return (weather_data["city_query"], weather_data["city"], date.timestamp(), date.isoformat(),
+                weather_data["temperature"], weather_data["weather_id"])
+
+    def save_cycle(self, weather_data:list, weather_codes:dict):
+        """
+        Write observations and weather descriptions of one scrape cycle in one transaction
+        :param weather_data: List of observations as returned by fetch_owm_weather_data
+        :param weather_codes: New or changed descriptions per weather id and language {weather_id: {lang: descp}}
+        """
+        langs = sorted({lang for descps in weather_codes.values() for lang in descps})
+        params = defaultdict(list)
+        for data in weather_data:
+            data_params = self.weather_data_params(data)
+            params[self.partition_table(data_params[2]) if self.partition_monthly else "weather_data"].append(data_params)
+
+        with self.lock, self.conn:
+            for table, table_params in params.items():
+                if table not in self.tables:
+                    self.create_weather_data_table(table)
+                self.conn.executemany(f"""INSERT INTO {table} (city_query, city, date_unix, date_str, temp, weather_id)
+                                          VALUES (?, ?, ?, ?, ?, ?)""", table_params)
+            # One UPSERT per weather id, descriptions missing in weather_codes keep their db value
+            if weather_codes:
+                cols = ", ".join(f"descp_{lang}" for lang in langs)
+                values = ", ".join("?" for _ in langs)
+                updates = ", ".join(f"descp_{lang} = COALESCE(excluded.descp_{lang}, descp_{lang})" for lang in langs)
+                self.conn.executemany(f"""INSERT INTO weather_codes (weather_id, {cols}) VALUES (?, {values})
+                                          ON CONFLICT(weather_id) DO UPDATE SET {updates}""",
+                                      [(weather_id, *[descps.get(lang) for lang in langs])
+                                       for weather_id, descps in weather_codes.items()])
+        logger.debug(f"Saved {len(weather_data)} observations and {len(weather_codes)} weather codes")
+
+    def last_observations(self) -> dict:
+        """Unix time of the latest observation per city query {city_query: date_unix}"""
+        last_observations = {}
+        with self.lock:
+            for table in self.weather_data_tables():
+                rows = self.conn.execute(f"""SELECT city_query, MAX(date_unix) FROM {table} GROUP BY city_query""").fetchall()
+                for city_query, date_unix in rows:
+                    last_observations[city_query] = max(date_unix, last_observations.get(city_query, date_unix))
+        return last_observations
+
+    def weather_codes_from_db(self) -> dict:
+        """Descriptions per weather id and language {weather_id: {lang: descp}}"""
+        with self.lock:
+            cursor = self.conn.execute("""SELECT * FROM weather_codes""")
+            cols = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        id_idx = cols.index("weather_id")
+        langs = [(i, col.replace("descp_", "")) for i, col in enumerate(cols) if col.startswith("descp_")]
+        return {row[id_idx]: {lang: row[i] for i, lang in langs} for row in rows}
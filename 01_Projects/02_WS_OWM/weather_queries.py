@@ -0,0 +1,112 @@
+"""
+History queries on the weather observations (weather_data and monthly partitions)
+Aggregates are computed in SQL, all queries use the (city, date_unix) indexes
+"""
+import logging
+from datetime import datetime, UTC
+
+from weather_db import WeatherDB
+
+logger = logging.getLogger(__name__)
+
+# ID is unique only within one table (see WeatherDB.create_weather_data_table), so it is not part of the results
+COLUMNS = "city_query, city, date_unix, date_str, temp, weather_id"
+
+
+class WeatherQueries:
+    def __init__(self, db:WeatherDB, city_column:str="city_query"):
+        """
+        :param city_column: Column identifying a city, city_query (as requested by the scraper)
+                            or city (name returned by OWM, e.g. "Mitte" for "Berlin")
+        """
+        if city_column not in ("city_query", "city"):
+            raise ValueError(f"Invalid city column {city_column}")
+        self.db = db
+        self.city_column = city_column
+
+    def tables(self, start:float=None, end:float=None) -> list:
+        """weather_data and the monthly partitions overlapping [start, end] (unix time)"""
+        tables = []
+        for table in self.db.weather_data_tables():
+            if table != "weather_data":
+                month_start = datetime.strptime(table[-6:], "%Y%m").replace(tzinfo=UTC)
+                next_month = month_start.replace(year=month_start.year + month_start.month // 12,
+                                                 month=month_start.month % 12 + 1)
+                if (end is not None and month_start.timestamp() > end) or \
+                   (start is not None and next_month.timestamp() <= start):
+                    continue
+            tables.append(table)
+        return tables
+
+    def query(self, sql:str, params:tuple=()) -> list:
+        """Rows as list of dicts"""
+        with self.db.lock:
+            cursor = self.db.conn.execute(sql, params)
+            cols = [description[0] for description in cursor.description]
+            return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def range_filter(start:float, end:float) -> tuple:
+        """WHERE condition on date_unix and its params"""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("date_unix >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("date_unix <= ?")
+            params.append(end)
+        return " AND ".join(conditions), tuple(params)
+
+    def latest_per_city(self) -> list:
+        """Latest observation for every city"""
+        latest = {}
+        for table in self.tables():
+            # Skip scan over the distinct cities of the (city, date_unix) index, one index seek per city
+            # instead of grouping all rows
+            col = self.city_column
+            rows = self.query(f"""WITH RECURSIVE cities(city) AS (
+                                      SELECT MIN({col}) FROM {table}
+                                      UNION ALL
+                                      SELECT (SELECT MIN({col}) FROM {table} WHERE {col} > cities.city)
+                                      FROM cities WHERE cities.city IS NOT NULL
+                                  )
+                                  SELECT {COLUMNS} FROM {table}
+                                  WHERE ID IN (SELECT (SELECT ID FROM {table} WHERE {col} = cities.city
+                                                       ORDER BY date_unix DESC LIMIT 1)
+                                               FROM cities WHERE cities.city IS NOT NULL)""")
+            for row in rows:
+                if row[col] not in latest or row["date_unix"] > latest[row[col]]["date_unix"]:
+                    latest[row[col]] = row
+        return sorted(latest.values(), key=lambda row: row[self.city_column])
+
+    def range_for_city(self, city:str, start:float=None, end:float=None) -> list:
+        """Observations of city in [start, end] (unix time), oldest first"""
+        condition, params = self.range_filter(start, end)
+        condition = f" AND {condition}" if condition else ""
+        tables = self.tables(start, end)
+        if not tables:
+            return []
+        sql = " UNION ALL ".join(f"SELECT {COLUMNS} FROM {table} WHERE {self.city_column} = ?{condition}" for table in tables)
+        return self.query(f"{sql} ORDER BY date_unix", (city, *params) * len(tables))
+
+    def daily_stats(self, city:str=None, start:float=None, end:float=None) -> list:
+        """
+        Daily min/max/mean temperature and number of observations per city (days in local time)
+        :param city: Only this city, all cities if None
+        """
+        conditions, params = self.range_filter(start, end)
+        conditions = [conditions] if conditions else []
+        if city is not None:
+            conditions.insert(0, f"{self.city_column} = ?")
+            params = (city, *params)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        tables = self.tables(start, end)
+        if not tables:
+            return []
+        source = " UNION ALL ".join(f"SELECT {self.city_column} AS city, date_unix, temp FROM {table}{where}" for table in tables)
+        return self.query(f"""SELECT city, date(date_unix, 'unixepoch', 'localtime') AS day,
+                                     MIN(temp) AS temp_min, MAX(temp) AS temp_max, AVG(temp) AS temp_mean,
+                                     COUNT(*) AS observations
+                              FROM ({source})
+                              GROUP BY city, day
+                              ORDER BY city, day""", params * len(tables))
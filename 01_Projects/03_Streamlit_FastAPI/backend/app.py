@@ -2,19 +2,68 @@
 pip install "fastapi[standard]"
 fastapi dev app.py
 """
-from fastapi import FastAPI
-import joblib
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
 import random
 
+import numpy as np
+
 from load_iris_data import load_iris_data
+from model_registry import ModelRegistry
+from micro_batcher import MicroBatcher
+from inference_pool import InferencePool
 
 import os
 from pathlib import Path
-os.chdir(Path(__file__).parent)
+
+BASE_DIR = Path(__file__).parent
+
+# Model artifact, watched for changes and swapped in without restart
+MODEL_PATH = os.environ.get("IRIS_MODEL_PATH", str(BASE_DIR / "rf_classifier_v1.joblib"))
+MODEL_POLL_INTERVAL = float(os.environ.get("IRIS_MODEL_POLL_INTERVAL", 5))
+# Token for the admin endpoints, admin endpoints are disabled if not set
+ADMIN_TOKEN = os.environ.get("IRIS_ADMIN_TOKEN")
+# Micro-batching of concurrent /predict requests, 0 ms disables
+BATCH_WAIT_MS = float(os.environ.get("IRIS_BATCH_WAIT_MS", 2))
+BATCH_MAX_ROWS = int(os.environ.get("IRIS_BATCH_MAX_ROWS", 64))
+# Inference runs off the event loop in a bounded "thread" or "process" pool
+INFERENCE_POOL = os.environ.get("IRIS_INFERENCE_POOL", "thread")
+INFERENCE_WORKERS = int(os.environ.get("IRIS_INFERENCE_WORKERS", 0)) or None
+
+model_registry = ModelRegistry(MODEL_PATH, poll_interval=MODEL_POLL_INTERVAL)
+inference_pool = InferencePool(model_registry, kind=INFERENCE_POOL, workers=INFERENCE_WORKERS)
+
+
+async def predict_rows(X:np.ndarray) -> list:
+    """Predicted species and model version for every row, one model call in the inference pool"""
+    predicted, model_version = await inference_pool.run("predict", X)
+    return [(int(p), model_version) for p in predicted]
+
+
+batcher = MicroBatcher(predict_rows, max_rows=BATCH_MAX_ROWS, max_wait_ms=BATCH_WAIT_MS) if BATCH_WAIT_MS > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # Load the model and iris data once at startup and watch the artifact for new versions
+    model_registry.load()
+    feature_names, _ = load_iris_data(select="attributes")
+    inference_pool.start()
+    watcher = asyncio.create_task(model_registry.watch()) if MODEL_POLL_INTERVAL > 0 else None
+    if batcher is not None:
+        batcher.start(n_features=len(feature_names))
+    yield
+    if batcher is not None:
+        await batcher.stop()
+    if watcher is not None:
+        watcher.cancel()
+    inference_pool.stop()
 
 
 # 1. Create the APP
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # http://52.158.35.106:8000/predict?
 @app.get("/predict")
@@ -28,12 +77,10 @@ async def predict_iris(idx:int=None, params:list=None):
         "index": Used index in test dataset (default: None),
         "params": Used list of parameter values,
         "predicted": Result of prediction as index of species,
-        "expected": Expected result from test data (default: None)
+        "expected": Expected result from test data (default: None),
+        "model_version": Version of the model used
     }
     """
-    # 1. Load the model
-    model = load_model()
-
     # Option 1: Given idx (index) from test data set
     if params is None:
         # 2. Load iris data for user example selection
@@ -49,11 +96,21 @@ async def predict_iris(idx:int=None, params:list=None):
 
     # Option 2: Given parameter list (params)
     else:
+        feature_names, _ = load_iris_data(select="attributes")
+        try:
+            params = np.asarray(params, dtype=float)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Parameter values must be numbers")
+        if params.shape != (len(feature_names),):
+            raise HTTPException(status_code=400, detail=f"Provide {len(feature_names)} parameter values")
         expected = None
         msg = f"Predict iris species with user parameters"
 
-    # 2. Predict using the model
-    predicted = int(model.predict([params])[0])
+    # 2. Predict using the model, concurrent requests are scored together
+    if batcher is not None:
+        predicted, model_version = await batcher.predict(params)
+    else:
+        predicted, model_version = (await predict_rows(params.reshape(1, -1)))[0]
 
     # 3. Return the price
     return {
@@ -61,7 +118,75 @@ async def predict_iris(idx:int=None, params:list=None):
         "index": idx,
         "params": params.tolist(),
         "predicted": predicted,
-        "expected": expected
+        "expected": expected,
+        "model_version": model_version
+    }
+
+
+class BatchRequest(BaseModel):
+    rows: list[list[float]] | None = None
+    indices: list[int] | None = None
+    proba: bool = False
+
+
+@app.post("/predict_batch")
+async def predict_batch(request:BatchRequest):
+    """
+    Predict iris species for many samples with one model call.
+    :param request: json {
+        "rows": List of parameter value lists (n x features), or
+        "indices": List of indices in test dataset,
+        "proba": Return class probabilities (default: false)
+    }
+    :return: json dict {
+        "msg": Message,
+        "n": Number of samples,
+        "predicted": List of predictions as index of species,
+        "expected": Expected results from test data (only for indices),
+        "probabilities": Class probabilities per sample (only with proba),
+        "model_version": Version of the model used
+    }
+    """
+    if (request.rows is None) == (request.indices is None):
+        raise HTTPException(status_code=400, detail="Provide either rows or indices")
+
+    expected = None
+    if request.indices is not None:
+        X_test, y_test = load_iris_data(select="test")
+        indices = np.asarray(request.indices, dtype=int)
+        if len(indices) and (indices.min() < -len(X_test) or indices.max() >= len(X_test)):
+            raise HTTPException(status_code=400, detail=f"Indices out of range for test set (n={len(X_test)})")
+        X = X_test[indices]
+        expected = y_test[indices].tolist()
+        msg = f"Predict iris species from test set (n={len(X_test)})"
+    else:
+        feature_names, target_names = load_iris_data(select="attributes")
+        if any(len(row) != len(feature_names) for row in request.rows):
+            raise HTTPException(status_code=400, detail=f"Every row needs {len(feature_names)} parameter values")
+        X = np.asarray(request.rows, dtype=float).reshape(-1, len(feature_names))
+        msg = f"Predict iris species with user parameters"
+
+    if len(X) == 0:
+        return {"msg": msg, "n": 0, "predicted": [], "expected": expected, "probabilities": None,
+                "model_version": model_registry.version}
+
+    # One vectorized model call for all samples, run in the inference pool
+    # Probabilities in the same pool call, so both come from the same model version
+    if request.proba:
+        (predicted, probabilities), model_version = await inference_pool.run(("predict", "predict_proba"), X)
+        probabilities = probabilities.tolist()
+    else:
+        predicted, model_version = await inference_pool.run("predict", X)
+        probabilities = None
+    predicted = predicted.tolist()
+
+    return {
+        "msg": msg,
+        "n": len(X),
+        "predicted": predicted,
+        "expected": expected,
+        "probabilities": probabilities,
+        "model_version": model_version
     }
 
 
@@ -95,8 +220,32 @@ async def list_features():
     return feature_names
 
 
-def load_model():
-    with open("rf_classifier_v1.joblib", mode ="rb") as file:
-        model = joblib.load(file)
+@app.get("/batcher_stats")
+async def batcher_stats():
+    return batcher.stats() if batcher is not None else None
+
+
+@app.get("/inference_stats")
+async def inference_stats():
+    return inference_pool.stats()
+
+
+@app.get("/model_version")
+async def model_version():
+    return model_registry.version
+
+
+@app.post("/admin/reload_model")
+async def reload_model(path:str=None, x_admin_token:str=Header(None)):
+    """
+    Load the model artifact again or a new artifact and swap it in without restart.
+    :param path: New model artifact (default: current artifact)
+    :return: Version of the loaded model
+    """
+    if ADMIN_TOKEN is None or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
-    return model
\ No newline at end of file
+    try:
+        return await asyncio.to_thread(model_registry.load, path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to load model: {e}")
@@ -0,0 +1,58 @@
+"""
+Per-sample latency of single-sample /predict requests vs one /predict_batch request
+python benchmark_predict.py --sizes 1 100 10000
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app import app
+from load_iris_data import load_iris_data
+
+
+def single_path(client:TestClient, indices:np.ndarray) -> float:
+    """Seconds per sample, one GET /predict per test set index"""
+    start = time.perf_counter()
+    for idx in indices:
+        response = client.get("/predict", params={"idx": int(idx)})
+        response.raise_for_status()
+    return (time.perf_counter() - start) / len(indices)
+
+
+def batch_path(client:TestClient, X:np.ndarray) -> float:
+    """Seconds per sample, one POST /predict_batch with all rows"""
+    start = time.perf_counter()
+    response = client.post("/predict_batch", json={"rows": X.tolist()})
+    response.raise_for_status()
+    assert response.json()["n"] == len(X)
+    return (time.perf_counter() - start) / len(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark iris prediction endpoints")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--single-max", type=int, default=1000,
+                        help="Maximum number of single-sample requests per size (latency is per sample)")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    X_test, _ = load_iris_data("test")
+    rng = np.random.default_rng(42)
+    with TestClient(app) as client:
+        # Warm up
+        single_path(client, np.arange(5))
+        batch_path(client, X_test[:5])
+
+        print(f"{'Samples':>8}{'Single /predict':>18}{'/predict_batch':>18}{'Speedup':>10}")
+        for size in args.sizes:
+            indices = rng.integers(0, len(X_test), size)
+            single = single_path(client, indices[:args.single_max])
+            batch = batch_path(client, X_test[indices])
+            print(f"{size:>8}{single * 1000:>15.3f} ms{batch * 1000:>15.3f} ms{single / batch:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Execution layer running model inference off the event loop
+Bounded thread pool (shared in-memory model) or process pool (model preloaded in every worker)
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Model of a process pool worker and its version (sha256 prefix)
+worker_model = None
+worker_sha = None
+
+
+def init_worker(path:str, sha:str):
+    """
+    Preload the model when the worker process starts
+    The version is the sha256 prefix of the bytes actually loaded (like in ModelRegistry.load), not the expected sha
+    """
+    global worker_model, worker_sha
+    data = Path(path).read_bytes()
+    worker_model = joblib.load(io.BytesIO(data))
+    worker_sha = hashlib.sha256(data).hexdigest()[:12]
+    if worker_sha != sha:
+        logger.warning(f"Model file {path} changed since the registry loaded it, sha256 {worker_sha} instead of {sha}")
+
+
+def call_methods(model, methods:tuple, X:np.ndarray) -> tuple:
+    """Results of the model methods for rows X, all from the same model"""
+    return tuple(getattr(model, method)(X) for method in methods)
+
+
+def predict_in_worker(path:str, sha:str, methods:tuple, X:np.ndarray) -> tuple:
+    """
+    Run model methods in a worker process, the model is reloaded only after a swap in the registry
+    :return: Tuple (results, sha256 prefix of the model used)
+    """
+    if worker_sha != sha:
+        init_worker(path, sha)
+    return call_methods(worker_model, methods, X), worker_sha
+
+
+class InferencePool:
+    def __init__(self, model_registry:ModelRegistry, kind:str="thread", workers:int=None, max_pending:int=None):
+        """
+        :param kind: "thread" (model shared in memory, sklearn releases the GIL in large parts of predict)
+                     or "process" (one model per worker process, no GIL contention)
+        :param workers: Number of threads/processes (default: number of CPUs, at most 4)
+        :param max_pending: Maximum number of submitted calls, further calls wait (default: 8 per worker)
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Invalid inference pool kind {kind}")
+        self.model_registry = model_registry
+        self.kind = kind
+        self.workers = workers or min(os.cpu_count() or 1, 4)
+        self.max_pending = max_pending or 8 * self.workers
+        self.executor = None
+        self.pending = None
+        self.calls = 0
+        self.in_flight = 0
+
+    def start(self):
+        """Create the pool, process workers load the current model at start"""
+        self.pending = asyncio.Semaphore(self.max_pending)
+        if self.kind == "process":
+            loaded = self.model_registry.get()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(str(loaded.path), loaded.version["sha256"]))
+            # Start all workers now instead of on the first requests
+            for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        logger.info(f"Started inference {self.kind} pool with {self.workers} workers")
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def run(self, method, X:np.ndarray) -> tuple:
+        """
+        Run model method ("predict" or "predict_proba") for rows X in the pool
+        :param method: Method name or tuple of method names, run in one call on the same model
+        :return: Tuple (result, model version), result is a tuple for a tuple of method names
+        """
+        methods = (method,) if isinstance(method, str) else tuple(method)
+        loaded = self.model_registry.get()
+        version = loaded.version
+        async with self.pending:
+            self.calls += 1
+            self.in_flight += 1
+            loop = asyncio.get_running_loop()
+            try:
+                if self.kind == "process":
+                    results, sha = await loop.run_in_executor(self.executor, predict_in_worker, str(loaded.path),
+                                                              loaded.version["sha256"], methods, X)
+                    if sha != loaded.version["sha256"]:
+                        # Artifact replaced before the registry reloaded it, report the model actually used
+                        version = {"file": loaded.path.name, "sha256": sha}
+                else:
+                    results = await loop.run_in_executor(self.executor, call_methods, loaded.model, methods, X)
+            finally:
+                self.in_flight -= 1
+        return (results[0] if isinstance(method, str) else results), version
+
+    def stats(self) -> dict:
+        return {"kind": self.kind, "workers": self.workers, "max_pending": self.max_pending,
+                "calls": self.calls, "in_flight": self.in_flight}
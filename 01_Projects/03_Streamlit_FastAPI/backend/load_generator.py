@@ -0,0 +1,86 @@
+"""
+Load generator for the iris backend, concurrent single-row /predict requests
+mixed with light requests (/list_features) to check that the event loop stays responsive
+fastapi run app.py --port 8000
+python load_generator.py --url http://127.0.0.1:8000 --concurrency 64 --requests 5000 --light-share 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+
+
+def percentiles(latencies:list) -> dict:
+    """p50/p95/p99 in ms of latencies in seconds"""
+    latencies = np.asarray(latencies) * 1000
+    return {f"p{q}_ms": float(np.percentile(latencies, q)) if len(latencies) else None for q in (50, 95, 99)}
+
+
+async def client_loop(client:httpx.AsyncClient, url:str, n_requests:int, light_share:float,
+                      latencies:dict, errors:list):
+    for _ in range(n_requests):
+        kind = "light" if random.random() < light_share else "predict"
+        start = time.perf_counter()
+        try:
+            if kind == "light":
+                response = await client.get(f"{url}/list_features")
+            else:
+                response = await client.get(f"{url}/predict", params={"idx": random.randrange(30)})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            errors.append(e)
+        else:
+            latencies[kind].append(time.perf_counter() - start)
+
+
+async def run(url:str, concurrency:int, n_requests:int, light_share:float=0.0) -> dict:
+    """
+    :param light_share: Share of requests to /list_features, reported separately from /predict
+    """
+    latencies, errors = {"predict": [], "light": []}, []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        per_client = [n_requests // concurrency + (i < n_requests % concurrency) for i in range(concurrency)]
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, url, n, light_share, latencies, errors) for n in per_client))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get(f"{url}/batcher_stats")).json()
+        inference_stats = (await client.get(f"{url}/inference_stats")).json()
+
+    n_ok = len(latencies["predict"]) + len(latencies["light"])
+    return {
+        "requests": n_ok,
+        "errors": len(errors),
+        "throughput": n_ok / elapsed,
+        **percentiles(latencies["predict"]),
+        "light": {"requests": len(latencies["light"]), **percentiles(latencies["light"])},
+        "batcher": stats,
+        "inference": inference_stats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load on the iris /predict endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=64, help="Number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=5000, help="Total number of requests")
+    parser.add_argument("--light-share", type=float, default=0.0, help="Share of light requests to /list_features")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url.rstrip("/"), args.concurrency, args.requests, args.light_share))
+    print(f"Requests: {result['requests']} ({result['errors']} errors), concurrency {args.concurrency}")
+    print(f"Throughput: {result['throughput']:0.0f} requests/s")
+    print(f"Latency /predict p50 {result['p50_ms']:0.2f} ms, p95 {result['p95_ms']:0.2f} ms, p99 {result['p99_ms']:0.2f} ms")
+    light = result["light"]
+    if light["requests"]:
+        print(f"Latency /list_features ({light['requests']} requests) p50 {light['p50_ms']:0.2f} ms, "
+              f"p95 {light['p95_ms']:0.2f} ms, p99 {light['p99_ms']:0.2f} ms")
+    print(f"Batcher: {result['batcher']}")
+    print(f"Inference: {result['inference']}")
+
+
+if __name__ == "__main__":
+    main()
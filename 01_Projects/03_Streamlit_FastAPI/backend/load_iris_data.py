@@ -1,42 +1,83 @@
 from sklearn.datasets import load_iris
 from sklearn.model_selection import train_test_split
 import pickle
+import threading
 
-import os
+import numpy as np
 from pathlib import Path
-os.chdir(Path(__file__).parent)
+
+BASE_DIR = Path(__file__).parent
+
+
+class IrisDataset:
+    """
+    Iris data and train/test split, loaded and computed once per process.
+    Arrays are returned as read-only views, safe to share between threads and requests.
+    """
+    def __init__(self, path:Path=BASE_DIR / "iris_data.pkl"):
+        self.path = path
+        self.lock = threading.Lock()
+        # Splits and attribute names, published with one assignment after loading
+        self.data = None
+
+    @staticmethod
+    def read_only(array:np.ndarray) -> np.ndarray:
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def load(self) -> dict:
+        # Load iris data
+        # from local folder if available otherwise download from sklearn
+        try:
+            with open(self.path, mode = "rb") as file:
+                iris = pickle.load(file)
+            print("Loaded Iris data locally")
+        except FileNotFoundError:
+            iris = load_iris()
+            print("Loaded Iris data from server")
+
+            with open(self.path, mode="wb") as file:
+                pickle.dump(iris, file)
+
+        X = iris.data  # (features)
+        y = iris.target  # (species)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+        # Own copies of the arrays, nobody else holds a writeable reference
+        return {
+            "splits": {
+                "all": tuple(self.read_only(a.copy()) for a in (X, y)),
+                "train": tuple(self.read_only(a.copy()) for a in (X_train, y_train)),
+                "test": tuple(self.read_only(a.copy()) for a in (X_test, y_test)),
+            },
+            "feature_names": tuple(iris.feature_names),
+            "target_names": tuple(iris.target_names.tolist()),
+        }
+
+    def get(self, select:str= "all"):
+        data = self.data
+        if data is None:
+            with self.lock:
+                if self.data is None:
+                    # Threads skipping the lock see either no data or all of it
+                    self.data = self.load()
+                data = self.data
+
+        if select in data["splits"]:
+            return data["splits"][select]
+        elif select == "attributes":
+            return list(data["feature_names"]), list(data["target_names"])
+        else:
+            return None
+
+
+iris_dataset = IrisDataset()
+
 
 def load_iris_data(select:str= "all"):
-    os.chdir(Path(__file__).parent)
-    # Load iris data
-    # from local folder if available otherwise download from sklearn
-    try:
-        with open("./iris_data.pkl", mode = "rb") as file:
-            iris = pickle.load(file)
-        print("Loaded Iris data locally")
-    except FileNotFoundError:
-        iris = load_iris()
-        print("Loaded Iris data from server")
-
-        with open("./iris_data.pkl", mode="wb") as file:
-            pickle.dump(iris, file)
-    except Exception as e:
-        print(e)
-
-    feature_names = iris.feature_names
-    target_names = iris.target_names.tolist()
-    X = iris.data  # (features)
-    y = iris.target  # (species)
-
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-    if select == "all":
-        return X, y
-    elif select == "test":
-        return X_test, y_test
-    elif select == "train":
-        return X_train, y_train
-    elif select == "attributes":
-        return feature_names, target_names
-    else:
-        return None
\ No newline at end of file
+    """
+    Iris data from the shared dataset (computed once per process).
+    :param select: "all", "train", "test" -> (X, y) as read-only arrays, "attributes" -> (feature_names, target_names)
+    """
+    return iris_dataset.get(select)
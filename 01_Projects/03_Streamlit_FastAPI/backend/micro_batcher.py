@@ -0,0 +1,104 @@
+"""
+Micro-batching of concurrent single-row predictions
+Rows arriving within a few milliseconds are scored with one vectorized model call
+"""
+import asyncio
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_rows:int=64, max_wait_ms:float=2.0):
+        """
+        :param predict_fn: Coroutine function scoring a 2D array of rows, returns one result per row
+        :param max_rows: Maximum number of rows per model call
+        :param max_wait_ms: Maximum time the first row of a batch waits for more rows
+        """
+        self.predict_fn = predict_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.n_features = None
+        self.queue = None
+        self.task = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self, n_features:int=None):
+        """
+        :param n_features: Number of values per row, other rows are rejected before they join a batch
+        """
+        self.n_features = n_features
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def predict(self, row):
+        """
+        Result for one row, scored together with other rows waiting at the same time
+        Raise ValueError for a row with another number of values, it would fail the whole batch
+        """
+        row = np.asarray(row, dtype=float)
+        if self.n_features is not None and row.shape != (self.n_features,):
+            raise ValueError(f"Row needs {self.n_features} values, got shape {row.shape}")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def collect(self) -> list:
+        """Wait for the first row, then for more rows until max_rows or max_wait is reached"""
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_rows:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self.collect()
+            # Requests cancelled while waiting (client disconnected) are dropped
+            batch = [(row, future) for row, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await self.predict_fn(np.asarray([row for row, _ in batch], dtype=float))
+            except Exception as e:
+                logger.error(f"Prediction of batch with {len(batch)} rows failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "max_rows": self.max_rows,
+            "max_wait_ms": self.max_wait * 1000
+        }
@@ -0,0 +1,90 @@
+"""
+Registry holding the trained model in memory
+The model is loaded once and swapped atomically when the artifact file changes or on request
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: object
+    version: dict
+    path: Path
+
+
+class ModelRegistry:
+    def __init__(self, path:str, poll_interval:float=5.0):
+        """
+        :param path: Model artifact (joblib file)
+        :param poll_interval: Seconds between checks of the artifact for changes, 0 disables watching
+        """
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self.current = None
+        self.file_state = None
+        self.lock = threading.Lock()
+
+    def stat(self, path:Path) -> tuple:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, path:str=None) -> dict:
+        """
+        Load model from path (default: current artifact) and swap it in, the old model stays active on errors
+        :return: Version of the loaded model
+        """
+        with self.lock:
+            path = Path(path) if path else self.path
+            file_state = self.stat(path)
+            data = path.read_bytes()
+            model = joblib.load(io.BytesIO(data))
+            version = {
+                "file": path.name,
+                "sha256": hashlib.sha256(data).hexdigest()[:12],
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+            }
+            # Requests read self.current once, a single assignment swaps model and version together
+            self.current = LoadedModel(model, version, path)
+            self.path = path
+            self.file_state = file_state
+        logger.info(f"Loaded model {version}")
+        return version
+
+    def get(self) -> LoadedModel:
+        if self.current is None:
+            raise RuntimeError("No model loaded")
+        return self.current
+
+    @property
+    def version(self) -> dict:
+        return self.current.version if self.current else None
+
+    def reload_if_changed(self) -> bool:
+        """Reload the artifact if its modification time or size changed, True if a new model was loaded"""
+        try:
+            changed = self.stat(self.path) != self.file_state
+        except FileNotFoundError:
+            return False
+        if changed:
+            self.load()
+        return changed
+
+    async def watch(self):
+        """Poll the artifact for changes until cancelled, a failed load is retried with the next poll"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.error(f"Failed to reload model {self.path}: {e}")
@@ -15,10 +15,14 @@ from datetime import datetime, UTC
 from textblob import TextBlob
 from supabase import create_client, Client
 
+from geocode_cache import GeocodeCache
+
 os.chdir(Path(__file__).parent)
 
 # Load logging configuration file
-logging.config.fileConfig('../config/logging_config.ini')
+logging.config.fileConfig('../config/logging_config.ini', disable_existing_loggers=False)
+# Request urls contain the api key
+logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 # Get personal OpenWeatherMap API Key
 load_dotenv("../.env")
@@ -30,6 +34,9 @@ SUPA_DB_PWD  = os.environ.get("SUPABASE_DB_PWD")
 
 LANG = "de"
 
+# Coordinates for city names, persisted across restarts
+geocode_cache = GeocodeCache('../db/geocode.db')
+
 # 1. Create the APP
 app = FastAPI()
 
@@ -101,22 +108,39 @@ def weather_city(city:str = None, session:str=None):
         logging.error(f"No city name provided")
         return {}
 
+    location = geocode_cache.lookup(city, lambda: geocode_owm(city))
+    if location is None:
+        return {}
+
+    lon = float(location["lon"])
+    lat = float(location["lat"])
+    logging.info(f"Got coordinates for {city} as {location['name']}: Longitude: {lon}, Latitude: {lat}")
+    return weather_coords(lon=lon, lat=lat, session=session)
+
+@app.get("/geocode_cache_stats")
+def geocode_cache_stats():
+    """
+    Hit/miss counters of the geocode cache
+    """
+    return geocode_cache.stats()
+
+def geocode_owm(city:str):
+    """
+    Coordinates for city name from OWM direct endpoint, location {"name", "lat", "lon"} or None
+    """
     url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}&limit=3&appid={OWM_API_KEY}"
-    logging.info(f"Requesting {url}")
+    logging.info(f"Requesting coordinates for {city}")
     response = requests.get(url)
 
     if response.status_code == 200:
         try:
             data = response.json()
-            lon = float(data[0]["lon"])
-            lat = float(data[0]["lat"])
-            name = data[0]["name"]
+            return {"name": data[0]["name"], "lat": float(data[0]["lat"]), "lon": float(data[0]["lon"])}
         except Exception as e:
             logging.error(f"Exception getting coordinates for {city} {e}")
-            return {}
-        else:
-            logging.info(f"Got coordinates for {city} as {name}: Longitude: {lon}, Latitude: {lat}")
-            return weather_coords(lon=lon, lat=lat, session=session)
+    else:
+        logging.error(f"Geocoding API Request Failed with Status Code {response.status_code}")
+    return None
 
 @app.get("/sentiment")
 def sentiment(text:str = None, session:str=None):
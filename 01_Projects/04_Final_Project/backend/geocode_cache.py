@@ -0,0 +1,121 @@
+"""
+Cache for city -> coordinate lookups
+In-memory LRU in front of a SQLite table, coordinates of a city never change so entries don't expire
+Same file in 02_WS_OWM and 04_Final_Project/backend (both run standalone without a shared package),
+keep the copies identical
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCache:
+    def __init__(self, db_path:str, maxsize:int=1024):
+        """
+        :param db_path: SQLite database file, table geocode_cache is created if missing
+        :param maxsize: Maximum number of entries kept in memory
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS geocode_cache
+                             (
+                                 query text primary key,
+                                 name text,
+                                 lat real,
+                                 lon real,
+                                 city_id integer,
+                                 created_unix integer
+                             )""")
+        # OWM city id, learned from the first weather response and used for group requests
+        cols = [row[1] for row in self.conn.execute("PRAGMA table_info(geocode_cache)")]
+        if "city_id" not in cols:
+            self.conn.execute("ALTER TABLE geocode_cache ADD COLUMN city_id integer")
+        self.conn.commit()
+        self.maxsize = maxsize
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        # Hits from memory and from db, misses needing a network request
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_query(city:str) -> str:
+        """Case and whitespace insensitive key, ' new  York' and 'New York' share one entry"""
+        return " ".join(city.split()).casefold()
+
+    def remember(self, key:str, location:dict):
+        self.lru[key] = location
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.maxsize:
+            self.lru.popitem(last=False)
+
+    def get(self, city:str) -> dict:
+        """Cached location {"name", "lat", "lon", "city_id"} for city or None"""
+        key = self.normalize_query(city)
+        with self.lock:
+            if key in self.lru:
+                self.lru.move_to_end(key)
+                self.memory_hits += 1
+                return self.lru[key]
+
+            row = self.conn.execute("SELECT name, lat, lon, city_id FROM geocode_cache WHERE query = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            location = {"name": row[0], "lat": row[1], "lon": row[2], "city_id": row[3]}
+            self.remember(key, location)
+            self.db_hits += 1
+            return location
+
+    def put(self, city:str, location:dict):
+        key = self.normalize_query(city)
+        location = {"city_id": None, **location}
+        with self.lock:
+            self.conn.execute("""INSERT INTO geocode_cache (query, name, lat, lon, city_id, created_unix) VALUES (?, ?, ?, ?, ?, ?)
+                                 ON CONFLICT(query) DO UPDATE SET name = excluded.name, lat = excluded.lat, lon = excluded.lon,
+                                                                  city_id = COALESCE(excluded.city_id, city_id)""",
+                              (key, location["name"], location["lat"], location["lon"], location["city_id"], int(time.time())))
+            self.conn.commit()
+            self.remember(key, location)
+
+    def set_city_id(self, city:str, city_id:int):
+        """Store OWM city id for a cached city"""
+        key = self.normalize_query(city)
+        with self.lock:
+            self.conn.execute("UPDATE geocode_cache SET city_id = ? WHERE query = ?", (city_id, key))
+            self.conn.commit()
+            if key in self.lru:
+                self.lru[key] = {**self.lru[key], "city_id": city_id}
+
+    def lookup(self, city:str, fetch) -> dict:
+        """
+        Location for city from cache, on a miss from fetch() which is then cached
+        :param fetch: Callable returning location {"name", "lat", "lon"} or None (not cached)
+        """
+        location = self.get(city)
+        if location is None:
+            location = fetch()
+            if location is not None:
+                self.put(city, location)
+        return location
+
+    def stats(self) -> dict:
+        with self.lock:
+            hits = self.memory_hits + self.db_hits
+            requests = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": hits / requests if requests else 0.0,
+                "memory_size": len(self.lru)
+            }
+
+    def close(self):
+        self.conn.close()